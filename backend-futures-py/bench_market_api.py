@@ -0,0 +1,121 @@
+"""Bytes on the wire and server work for typical dashboard polling of the market API.
+
+For each endpoint the dashboard polls, three ways of polling are compared:
+
+    before      plain GET, identity body (what every poll cost without ETag/gzip)
+    gzip        GET with Accept-Encoding: gzip
+    304         GET with If-None-Match of the previous ETag (unchanged data)
+
+With `--local` the server runs in-process against MONGO_URI from .env and the
+script also times, per endpoint, building + serializing the JSON against
+computing the source version that the 304 path needs:
+
+    python bench_market_api.py --url http://127.0.0.1:5050
+    python bench_market_api.py --local --polls 50
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import urllib.error
+import urllib.request
+from threading import Thread
+
+ENDPOINTS = [
+    "/api/mxf?all=1",
+    "/api/etf_holding_changes?etfs=etf_00981A,etf_00982A",
+    "/api/etf_holdings_counts",
+]
+
+
+def _poll(url: str, headers: dict) -> tuple[int, int, float, str]:
+    """(status, body bytes on the wire, milliseconds, ETag) of one GET."""
+    request = urllib.request.Request(url, headers=headers)
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            body = response.read()
+            status, etag = response.status, response.headers.get("ETag", "")
+    except urllib.error.HTTPError as exc:
+        body = exc.read()
+        status, etag = exc.code, exc.headers.get("ETag", "")
+    return status, len(body), (time.perf_counter() - started) * 1000, etag
+
+
+def bench_http(base_url: str, path: str, polls: int) -> None:
+    url = f"{base_url}{path}"
+    _, _, _, etag = _poll(url, {"Accept-Encoding": "gzip"})
+    modes = {
+        "before": {"Accept-Encoding": "identity"},
+        "gzip": {"Accept-Encoding": "gzip"},
+        "304": {"Accept-Encoding": "gzip", "If-None-Match": etag},
+    }
+    print(f"📊 {path}")
+    for label, headers in modes.items():
+        results = [_poll(url, headers) for _ in range(polls)]
+        statuses = sorted({status for status, _, _, _ in results})
+        size = statistics.fmean(size for _, size, _, _ in results)
+        latency = statistics.median(ms for _, _, ms, _ in results)
+        print(f"   {label:<7} 狀態 {statuses} / 平均 {size:,.0f} bytes / p50 {latency:.1f} ms")
+
+
+def bench_server_work(polls: int) -> None:
+    """Time the full fetch + JSON encode against the version lookup behind a 304."""
+    import mongo_market_api as api
+
+    work = {
+        "/api/mxf?all=1": (
+            lambda: api._encode_json(api.fetch_mxf_series(None)),
+            lambda: api.mxf_series_version(None),
+        ),
+        "/api/etf_holding_changes": (
+            lambda: api._encode_json(api.fetch_etf_holding_changes(None, ["etf_00981A", "etf_00982A"])),
+            lambda: api.etf_holding_changes_version(None, ["etf_00981A", "etf_00982A"]),
+        ),
+    }
+    for path, (build, version) in work.items():
+        timings = {}
+        for label, func in (("fetch+serialize", build), ("version", version)):
+            samples = []
+            for _ in range(polls):
+                started = time.perf_counter()
+                func()
+                samples.append((time.perf_counter() - started) * 1000)
+            timings[label] = statistics.median(samples)
+        print(
+            f"⏱️ {path}: fetch+serialize p50 {timings['fetch+serialize']:.2f} ms / "
+            f"version p50 {timings['version']:.2f} ms"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5050", help="running market API base URL")
+    parser.add_argument("--local", action="store_true", help="start an in-process server and time server work")
+    parser.add_argument("--polls", type=int, default=20, help="requests per endpoint and mode")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url.rstrip("/")
+    if args.local:
+        import mongo_market_api as api
+
+        server = api.PooledHTTPServer(("127.0.0.1", 0), api.MarketApiHandler, api.MARKET_API_WORKERS)
+        Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        for path in ENDPOINTS:
+            bench_http(base_url, path, args.polls)
+        if args.local:
+            bench_server_work(args.polls)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
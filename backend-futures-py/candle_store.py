@@ -0,0 +1,196 @@
+"""In-process candle store shared by the webhook server and strategies.
+
+Each timeframe keeps a fixed-capacity ring of recent candles in memory. The
+ring is seeded once from the timeframe CSV, the webhook handler appends new
+candles to it, and strategies read the latest bars from memory. The CSV files
+remain the durable journal and are written by a background thread.
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+import queue
+import sys
+from collections import deque
+from threading import Lock, Thread
+from typing import Any
+
+BASE_DIR = os.path.dirname(__file__)
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from strategy_common import ensure_csv_header, read_last_n_rows
+
+TV_DOC_DIR = os.path.join(BASE_DIR, "tv_doc")
+
+CSV_FILE_1MIN = os.path.join(TV_DOC_DIR, "webhook_data_1min.csv")
+CSV_FILE_5MIN = os.path.join(TV_DOC_DIR, "webhook_data_5min.csv")
+CSV_FILE_10MIN = os.path.join(TV_DOC_DIR, "webhook_data_10min.csv")
+CSV_FILE_15MIN = os.path.join(TV_DOC_DIR, "webhook_data_15min.csv")
+
+CSV_FILE_BY_TIMEFRAME = {
+    "1": CSV_FILE_1MIN,
+    "5": CSV_FILE_5MIN,
+    "10": CSV_FILE_10MIN,
+    "15": CSV_FILE_15MIN,
+}
+
+CSV_HEADER = [
+    "Record Time",
+    "Symbol",
+    "Timeframe",
+    "TradingView Time",
+    "Open",
+    "High",
+    "Low",
+    "Close",
+    "MA_960",
+    "MA_P80",
+    "MA_P200",
+    "MA_N110",
+    "MA_N200",
+    "tt_short",
+    "tt_long",
+    "BBR",
+]
+
+CANDLE_STORE_CAPACITY = 512
+
+
+class Candle:
+    """One webhook candle, stored as the raw text written to the CSV."""
+
+    __slots__ = (
+        "record_time",
+        "symbol",
+        "timeframe",
+        "tv_time",
+        "open",
+        "high",
+        "low",
+        "close",
+        "ma_960",
+        "ma_p80",
+        "ma_p200",
+        "ma_n110",
+        "ma_n200",
+        "tt_short",
+        "tt_long",
+        "bbr",
+    )
+
+    def __init__(self, values: list[object]) -> None:
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, "" if value is None else str(value))
+        for name in self.__slots__[len(values):]:
+            setattr(self, name, "")
+
+    @classmethod
+    def from_csv_row(cls, row: dict) -> "Candle":
+        return cls([row.get(column) for column in CSV_HEADER])
+
+    def get(self, column: str, default: Any = None) -> Any:
+        """Dict-style access by CSV column name, matching `csv.DictReader` rows."""
+        name = _SLOT_BY_COLUMN.get(column)
+        if name is None:
+            return default
+        return getattr(self, name)
+
+    def to_row(self) -> list[str]:
+        return [getattr(self, name) for name in self.__slots__]
+
+
+_SLOT_BY_COLUMN = dict(zip(CSV_HEADER, Candle.__slots__))
+
+
+class CandleStore:
+    """Fixed-capacity ring of candles for a single timeframe."""
+
+    def __init__(self, csv_path: str, capacity: int = CANDLE_STORE_CAPACITY) -> None:
+        self.csv_path = csv_path
+        self._candles: deque[Candle] = deque(maxlen=capacity)
+        self._lock = Lock()
+        self._loaded = False
+
+    def load(self) -> None:
+        """Seed the ring from the tail of the CSV journal (once)."""
+        with self._lock:
+            if self._loaded:
+                return
+            rows = read_last_n_rows(self.csv_path, self._candles.maxlen)
+            self._candles.extend(Candle.from_csv_row(row) for row in rows)
+            self._loaded = True
+
+    def append(self, row: list[object]) -> Candle:
+        """Add a candle to the ring and queue it for the CSV journal."""
+        self.load()
+        candle = Candle(row)
+        with self._lock:
+            self._candles.append(candle)
+        _JOURNAL_QUEUE.put((self.csv_path, candle.to_row()))
+        return candle
+
+    def last(self, count: int) -> list[Candle]:
+        """Return the newest `count` candles, oldest first."""
+        if count <= 0:
+            return []
+        self.load()
+        with self._lock:
+            size = len(self._candles)
+            return [self._candles[index] for index in range(max(0, size - count), size)]
+
+
+CANDLE_STORES = {timeframe: CandleStore(path) for timeframe, path in CSV_FILE_BY_TIMEFRAME.items()}
+
+_JOURNAL_QUEUE: "queue.Queue[tuple[str, list[str]]]" = queue.Queue()
+_JOURNAL_THREAD: Thread | None = None
+_JOURNAL_THREAD_LOCK = Lock()
+
+
+def _journal_worker() -> None:
+    while True:
+        path, row = _JOURNAL_QUEUE.get()
+        try:
+            ensure_csv_header(path, CSV_HEADER)
+            with open(path, "a", newline="", encoding="utf-8") as handle:
+                csv.writer(handle).writerow(row)
+        except Exception as exc:
+            print(f"⚠️ Candle journal write failed for {path}: {exc}")
+            sys.stdout.flush()
+        finally:
+            _JOURNAL_QUEUE.task_done()
+
+
+def _ensure_journal_thread() -> None:
+    global _JOURNAL_THREAD
+    with _JOURNAL_THREAD_LOCK:
+        if _JOURNAL_THREAD is None or not _JOURNAL_THREAD.is_alive():
+            _JOURNAL_THREAD = Thread(target=_journal_worker, name="candle-journal", daemon=True)
+            _JOURNAL_THREAD.start()
+
+
+def load_candle_stores() -> None:
+    """Seed every timeframe ring from disk and start the journal writer."""
+    for store in CANDLE_STORES.values():
+        store.load()
+    _ensure_journal_thread()
+
+
+def append_candle(timeframe: str, row: list[object]) -> Candle:
+    """Record a webhook candle for `timeframe` in memory and in the CSV journal."""
+    _ensure_journal_thread()
+    return CANDLE_STORES[timeframe].append(row)
+
+
+def get_last_candles(timeframe: str, count: int) -> list[Candle]:
+    """Return the newest `count` candles for `timeframe` from memory."""
+    store = CANDLE_STORES.get(timeframe)
+    if store is None:
+        return []
+    return store.last(count)
+
+
+def flush_candle_journal() -> None:
+    """Block until every queued candle has been written to its CSV."""
+    _JOURNAL_QUEUE.join()
@@ -0,0 +1,171 @@
+"""Parity check between the HTTP holdings parser and the Selenium table script.
+
+monitor_pocket_etf parses pocket.tw pages two ways: `parse_holdings_html` on the
+plain HTTP response, and `_parse_holdings_tables` on what `_TABLE_ROWS_SCRIPT`
+returns from Chrome. Both must give the same rows, in the same text format, so
+that switching paths in auto mode does not show up as holdings changes.
+
+The table.html / sloppy_table.html / next_data.html fixtures are hand-written
+pages shaped like pocket.tw (`expected.json`); their `.rows.json` files are
+written by `--chrome --capture`, and were written by hand to the script's
+output format where Chrome was not available. `--capture-live` saves a real
+page as `live_<symbol>.html` through the HTTP path and the Chrome script output
+as `live_<symbol>.rows.json` / `live_<symbol>.expected.json`; saved live
+fixtures are checked on every run:
+
+    python check_pocket_etf_parser.py                         # HTML/JSON parser + stored script output
+    python check_pocket_etf_parser.py --chrome                # also run _TABLE_ROWS_SCRIPT in headless Chrome
+    python check_pocket_etf_parser.py --chrome --capture      # rewrite the stored <fixture>.rows.json
+    python check_pocket_etf_parser.py --capture-live 00981A   # capture pocket.tw through both paths
+
+Run it after changing `_TableCollector`, `_holdings_from_json`,
+`_parse_holdings_tables` or `_TABLE_ROWS_SCRIPT`.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from monitor_pocket_etf import (
+    ETF_TARGETS,
+    _TABLE_ROWS_SCRIPT,
+    _get_http_session,
+    _parse_holdings_tables,
+    _quit_driver,
+    _start_driver,
+    parse_holdings_html,
+)
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures" / "pocket_etf"
+EXPECTED_PATH = FIXTURE_DIR / "expected.json"
+# (fixture, 持股表格是否直接在 HTML 裡；next_data.html 只有內嵌 JSON，表格由前端渲染)
+FIXTURES = [
+    ("table.html", True),
+    ("sloppy_table.html", True),
+    ("next_data.html", False),
+]
+
+
+def _rows_path(fixture: str) -> Path:
+    return FIXTURE_DIR / f"{Path(fixture).stem}.rows.json"
+
+
+def _live_fixtures() -> list[tuple[str, Path]]:
+    return [
+        (path.name, FIXTURE_DIR / f"{path.stem}.expected.json")
+        for path in sorted(FIXTURE_DIR.glob("live_*.html"))
+    ]
+
+
+def _report(label: str, actual: list[dict], expected: list[dict]) -> bool:
+    if actual == expected:
+        print(f"✅ {label}: {len(actual)} 筆")
+        return True
+    print(f"❌ {label}: 得到 {len(actual)} 筆，預期 {len(expected)} 筆")
+    for index, (got, want) in enumerate(zip(actual, expected)):
+        if got != want:
+            print(f"   第 {index} 筆不同: {got} != {want}")
+            break
+    return False
+
+
+def check_stored(expected: list[dict]) -> bool:
+    ok = True
+    for fixture, has_table in FIXTURES:
+        html = (FIXTURE_DIR / fixture).read_text(encoding="utf-8")
+        ok &= _report(f"{fixture} parse_holdings_html", parse_holdings_html(html), expected)
+        rows_path = _rows_path(fixture)
+        if has_table and rows_path.exists():
+            tables = json.loads(rows_path.read_text(encoding="utf-8"))
+            ok &= _report(f"{rows_path.name} _parse_holdings_tables", _parse_holdings_tables(tables), expected)
+    return ok
+
+
+def check_live() -> bool:
+    """Captured pocket.tw pages: the HTTP parser must match what the Chrome script saw."""
+    ok = True
+    for fixture, expected_path in _live_fixtures():
+        expected = json.loads(expected_path.read_text(encoding="utf-8"))
+        tables = json.loads(_rows_path(fixture).read_text(encoding="utf-8"))
+        ok &= _report(f"{fixture} _parse_holdings_tables", _parse_holdings_tables(tables), expected)
+        actual = parse_holdings_html((FIXTURE_DIR / fixture).read_text(encoding="utf-8"))
+        if not actual:
+            # HTTP 路徑抓不到時 auto 模式會改用 Selenium，不算不一致
+            print(f"⚠️ {fixture} parse_holdings_html: 無資料，auto 模式會改用 Selenium")
+            continue
+        ok &= _report(f"{fixture} parse_holdings_html", actual, expected)
+    return ok
+
+
+def capture_live(symbol: str) -> bool:
+    """Save one pocket.tw holdings page through the HTTP path and the Chrome script."""
+    url = next((url for code, url, _ in ETF_TARGETS if code == symbol), None)
+    if url is None:
+        url = f"https://www.pocket.tw/etf/tw/{symbol}/fundholding/"
+    stem = f"live_{symbol}"
+
+    response = _get_http_session().get(url, timeout=20)
+    response.raise_for_status()
+    if "charset" not in response.headers.get("Content-Type", "").lower():
+        response.encoding = "utf-8"
+    (FIXTURE_DIR / f"{stem}.html").write_text(response.text, encoding="utf-8")
+
+    driver = _start_driver()
+    try:
+        driver.get(url)
+        WebDriverWait(driver, 30).until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "table")))
+        tables = driver.execute_script(_TABLE_ROWS_SCRIPT) or []
+    finally:
+        _quit_driver(driver)
+    expected = _parse_holdings_tables(tables)
+    (FIXTURE_DIR / f"{stem}.rows.json").write_text(json.dumps(tables, ensure_ascii=False) + "\n", encoding="utf-8")
+    (FIXTURE_DIR / f"{stem}.expected.json").write_text(
+        json.dumps(expected, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+    )
+    print(f"📝 已擷取 {url}: Selenium {len(expected)} 筆 → {stem}.html / .rows.json / .expected.json")
+    return bool(expected)
+
+
+def check_chrome(expected: list[dict], capture: bool) -> bool:
+    ok = True
+    driver = _start_driver()
+    try:
+        for fixture, has_table in FIXTURES:
+            if not has_table:
+                continue
+            driver.get((FIXTURE_DIR / fixture).as_uri())
+            tables = driver.execute_script(_TABLE_ROWS_SCRIPT) or []
+            if capture:
+                _rows_path(fixture).write_text(json.dumps(tables, ensure_ascii=False) + "\n", encoding="utf-8")
+                print(f"📝 已更新 {_rows_path(fixture).name}")
+            ok &= _report(f"{fixture} Chrome _TABLE_ROWS_SCRIPT", _parse_holdings_tables(tables), expected)
+    finally:
+        _quit_driver(driver)
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chrome", action="store_true", help="run _TABLE_ROWS_SCRIPT in headless Chrome too")
+    parser.add_argument("--capture", action="store_true", help="with --chrome, rewrite the stored rows fixtures")
+    parser.add_argument("--capture-live", metavar="SYMBOL", help="save the pocket.tw page of SYMBOL as a live fixture")
+    args = parser.parse_args()
+
+    expected = json.loads(EXPECTED_PATH.read_text(encoding="utf-8"))
+    ok = True
+    if args.capture_live:
+        ok &= capture_live(args.capture_live)
+    if args.chrome:
+        ok &= check_chrome(expected, args.capture)
+    ok &= check_stored(expected)
+    ok &= check_live()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
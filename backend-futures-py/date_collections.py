@@ -0,0 +1,132 @@
+"""Date-named (YYYY-MM-DD) collections: discovery cache and `time` indexes.
+
+The monitors write one collection per trading day. Readers used to call
+`list_collection_names()` on every request to find the newest one, and the
+latest-document lookups (`sort time desc, _id desc`) had no index behind them.
+
+`DateCollections` keeps the sorted day names per database and refreshes them
+at most every DATE_COLLECTIONS_REFRESH_SECONDS. `ensure_time_index` adds the
+compound (time, _id) index that serves those sorts in either direction, and
+`find_latest_doc` reads the newest (time, _id) from that index alone before
+fetching the one document by _id.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import time
+from threading import Lock
+
+from pymongo import ASCENDING, DESCENDING
+
+TIME_INDEX_KEYS = [("time", ASCENDING), ("_id", ASCENDING)]
+TIME_INDEX_NAME = "time_1__id_1"
+LATEST_SORT = [("time", DESCENDING), ("_id", DESCENDING)]
+# 只取索引內的欄位，最新資料查詢可以完全由索引回答（不必 FETCH 文件）
+LATEST_KEY_PROJECTION = {"time": 1, "_id": 1}
+
+_DATE_NAME = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+_indexed: set[tuple[str, str]] = set()
+_indexed_lock = Lock()
+
+
+def refresh_seconds_setting() -> float:
+    """DATE_COLLECTIONS_REFRESH_SECONDS; read on every refresh because callers load .env after their imports."""
+    return float(os.getenv("DATE_COLLECTIONS_REFRESH_SECONDS", "60"))
+
+
+def is_date_collection(name: str) -> bool:
+    return bool(_DATE_NAME.fullmatch(name))
+
+
+def ensure_time_index(collection) -> None:
+    """Create the (time, _id) index once per process. Call only for collections that exist."""
+    key = (collection.database.name, collection.name)
+    with _indexed_lock:
+        if key in _indexed:
+            return
+        _indexed.add(key)
+    try:
+        collection.create_index(TIME_INDEX_KEYS, name=TIME_INDEX_NAME)
+    except Exception as exc:
+        print(f"⚠️ 無法建立 {key[0]}.{key[1]} time 索引: {exc}")
+        with _indexed_lock:
+            _indexed.discard(key)
+
+
+class DateCollections:
+    """Cached, sorted list of the date collections in one database."""
+
+    def __init__(self, db, refresh_seconds: float | None = None, index_time: bool = False) -> None:
+        self.db = db
+        # None：每次刷新時從 DATE_COLLECTIONS_REFRESH_SECONDS 讀取
+        self.refresh_seconds = refresh_seconds
+        self.index_time = index_time
+        self._names: list[str] = []
+        self._expires_at = 0.0
+        self._lock = Lock()
+
+    def names(self, refresh: bool = False) -> list[str]:
+        with self._lock:
+            if refresh or time.monotonic() >= self._expires_at:
+                names = sorted(name for name in self.db.list_collection_names() if is_date_collection(name))
+                if self.index_time:
+                    for name in set(names) - set(self._names):
+                        ensure_time_index(self.db[name])
+                self._names = names
+                refresh_seconds = self.refresh_seconds
+                if refresh_seconds is None:
+                    refresh_seconds = refresh_seconds_setting()
+                self._expires_at = time.monotonic() + refresh_seconds
+            return self._names
+
+    def latest(self) -> str | None:
+        names = self.names()
+        return names[-1] if names else None
+
+
+def find_latest_doc(collection, query: dict | None = None, projection: dict | None = None) -> dict | None:
+    """Newest document by (time, _id); `query` may only filter on `time` for the lookup to stay index-only."""
+    key = collection.find_one(query or {}, LATEST_KEY_PROJECTION, sort=LATEST_SORT)
+    if key is None:
+        return None
+    return collection.find_one({"_id": key["_id"]}, projection)
+
+
+def _plan_stages(plan: object) -> list[str]:
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for key, value in plan.items():
+            if key in ("inputStage", "inputStages", "queryPlan", "shards", "winningPlan"):
+                stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+def latest_lookup_stages(collection, query: dict | None = None) -> list[str]:
+    """Winning-plan stages of the latest-document lookup on `collection`."""
+    explain = collection.find(query or {}, LATEST_KEY_PROJECTION).sort(LATEST_SORT).limit(1).explain()
+    return _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+
+
+def is_index_only(stages: list[str]) -> bool:
+    """True for a plan that walks an index without an in-memory sort or reading documents."""
+    return "IXSCAN" in stages and not {"SORT", "COLLSCAN", "FETCH"} & set(stages)
+
+
+def check_latest_lookup(collection, query: dict | None = None) -> bool:
+    """True when the latest-document lookup is answered from the (time, _id) index alone."""
+    stages = latest_lookup_stages(collection, query)
+    ok = is_index_only(stages)
+    label = f"{collection.database.name}.{collection.name}"
+    if ok:
+        print(f"✅ {label} 最新資料查詢走索引: {' > '.join(stages)}")
+    else:
+        print(f"⚠️ {label} 最新資料查詢未使用索引: {' > '.join(stages) or '-'}")
+    return ok
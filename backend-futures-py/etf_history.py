@@ -0,0 +1,265 @@
+"""Compact ETF holdings history: periodic base snapshots plus deltas.
+
+History documents in each `etf_*` collection are either
+
+    base:  {"kind": "base", "time", "source", "data": [rows]}
+    delta: {"kind": "delta", "base_id", "time", "source",
+            "added": [rows], "removed": [codes], "changed": {code: {<changed fields>}},
+            "order": [codes]}   # only when the row order differs from the default
+
+A delta is always relative to its base (never to another delta), so any
+snapshot is rebuilt from at most two documents. Documents written before this
+format carry `data` without `kind` and are read as bases, as is `_id: "latest"`.
+
+Holding changes are materialized next to the history in ETF_CHANGES_COLLECTION,
+one document per ETF and snapshot date, comparing that date's last snapshot
+with the last one of an earlier date:
+
+    {"_id": "<etf>|<date>", "etf", "date", "previous_date", "time",
+     "holdings": [{"code", "name", "latest_holding_count", "previous_holding_count",
+                   "weight", "weight_num"}]}   # counts are ints, one entry per code held on `date`
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+
+import bson
+from pymongo import ASCENDING, DESCENDING
+
+from numeric_fields import HOLDING_NUMERIC_FIELDS, NUMERIC_SUFFIX, parse_number
+
+ETF_CHANGES_COLLECTION = "etf_holding_changes"
+
+_SORT_NEWEST = [("time", DESCENDING), ("_id", DESCENDING)]
+
+
+def _row_code(row: object) -> str:
+    return str(row.get("code", "")).strip() if isinstance(row, dict) else ""
+
+
+def _keyed_by_code(rows: list[dict]) -> bool:
+    """True when every row has a code and no code repeats, i.e. a delta can rebuild `rows` exactly."""
+    codes = [_row_code(row) for row in rows]
+    return all(codes) and len(set(codes)) == len(codes)
+
+
+def _same_value(field: str, base_value: object, value: object) -> bool:
+    """Equal, or the same number written differently ("1000" / "1,000", "5%" / "5.00%")."""
+    if base_value == value:
+        return True
+    if field not in HOLDING_NUMERIC_FIELDS:
+        return False
+    base_number = parse_number(base_value)
+    return base_number is not None and base_number == parse_number(value)
+
+
+def diff_holdings(base_rows: list[dict], rows: list[dict]) -> dict:
+    """Describe `rows` relative to `base_rows` as added / removed / changed entries.
+
+    Shares and weight are compared as numbers, so a row whose only difference is
+    the text format (HTTP vs Selenium path) is not a change and keeps the base's text.
+    """
+    base_map = {_row_code(row): row for row in base_rows if _row_code(row)}
+    codes = [_row_code(row) for row in rows if _row_code(row)]
+    added, changed = [], {}
+    for row in rows:
+        code = _row_code(row)
+        if not code:
+            continue
+        base_row = base_map.get(code)
+        if base_row is None or set(base_row) != set(row):
+            added.append(row)
+            continue
+        fields = {key: value for key, value in row.items() if not _same_value(key, base_row.get(key), value)}
+        if fields:
+            changed[code] = fields
+
+    current = set(codes)
+    replaced = {_row_code(row) for row in added}
+    removed = [code for code in base_map if code not in current or code in replaced]
+    delta = {"added": added, "removed": removed, "changed": changed}
+    if codes != _default_order(base_rows, delta):
+        delta["order"] = codes
+    return delta
+
+
+def _default_order(base_rows: list[dict], delta: dict) -> list[str]:
+    removed = set(delta.get("removed", []))
+    order = [_row_code(row) for row in base_rows if _row_code(row) and _row_code(row) not in removed]
+    order.extend(_row_code(row) for row in delta.get("added", []))
+    return order
+
+
+def apply_holdings_delta(base_rows: list[dict], delta: dict) -> list[dict]:
+    """Rebuild the rows a delta describes from its base rows."""
+    removed = set(delta.get("removed", []))
+    rows = {
+        _row_code(row): dict(row)
+        for row in base_rows
+        if _row_code(row) and _row_code(row) not in removed
+    }
+    for code, fields in delta.get("changed", {}).items():
+        row = rows.get(code)
+        if row is not None:
+            row.update(fields)
+    for row in delta.get("added", []):
+        rows[_row_code(row)] = dict(row)
+    order = delta.get("order") or _default_order(base_rows, delta)
+    return [rows[code] for code in order if code in rows]
+
+
+def _latest_base(collection) -> dict | None:
+    return collection.find_one({"_id": {"$ne": "latest"}, "kind": {"$ne": "delta"}}, sort=_SORT_NEWEST)
+
+
+def history_settings() -> tuple[int, float]:
+    """(ETF_HISTORY_BASE_DAYS, ETF_HISTORY_MAX_DELTA_RATIO).
+
+    Read on every call because the monitors load .env after their imports.
+    """
+    # 每隔幾天寫一份完整 base；其餘執行只存相對 base 的差異
+    base_days = int(os.getenv("ETF_HISTORY_BASE_DAYS", "7"))
+    # 差異的 BSON 大小超過完整快照的這個比例時，直接改寫新的 base
+    max_delta_ratio = float(os.getenv("ETF_HISTORY_MAX_DELTA_RATIO", "0.8"))
+    return base_days, max_delta_ratio
+
+
+def make_history_doc(collection, doc_id: str, timestamp: str, source: str, data: list[dict]) -> dict:
+    """Return the history document to insert for a new snapshot: a delta when possible.
+
+    Deltas are keyed by code, so a snapshot (or base) with duplicate or missing
+    codes is always written as a base.
+    """
+    base_days, max_delta_ratio = history_settings()
+    base = _latest_base(collection)
+    if base is not None:
+        base_time = datetime.strptime(str(base.get("time", ""))[:10] or "1970-01-01", "%Y-%m-%d")
+        fresh = datetime.strptime(timestamp[:10], "%Y-%m-%d") - base_time < timedelta(days=base_days)
+        base_rows = base.get("data", []) if isinstance(base.get("data"), list) else []
+        if fresh and base_rows and _keyed_by_code(base_rows) and _keyed_by_code(data):
+            delta = diff_holdings(base_rows, data)
+            if len(bson.encode(delta)) <= len(bson.encode({"data": data})) * max_delta_ratio:
+                return {
+                    "_id": doc_id,
+                    "kind": "delta",
+                    "base_id": base["_id"],
+                    "time": timestamp,
+                    "source": source,
+                    **delta,
+                }
+    return {"_id": doc_id, "kind": "base", "time": timestamp, "source": source, "data": data}
+
+
+def reconstruct_snapshot(collection, doc: dict | None) -> dict | None:
+    """Return `doc` with its full `data` rows, loading the base when `doc` is a delta."""
+    if not doc or doc.get("kind") != "delta":
+        return doc
+    base = collection.find_one({"_id": doc.get("base_id")}, {"data": 1})
+    base_rows = base.get("data", []) if base else []
+    snapshot = {
+        key: value
+        for key, value in doc.items()
+        if key not in ("kind", "base_id", "added", "removed", "changed", "order")
+    }
+    snapshot["data"] = apply_holdings_delta(base_rows, doc)
+    return snapshot
+
+
+def find_snapshot(collection, query: dict) -> dict | None:
+    """Newest history snapshot matching `query`, reconstructed to full rows."""
+    cursor = collection.find(query).sort(_SORT_NEWEST).limit(1)
+    return reconstruct_snapshot(collection, next(iter(cursor), None))
+
+
+def _holding_count(row: dict) -> int:
+    """holding_count_num of a row (0 when missing or not numeric); the text is not re-parsed.
+
+    Rows written before numeric_fields get the field from migrate_numeric_fields.py.
+    """
+    value = row.get("holding_count" + NUMERIC_SUFFIX)
+    return int(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+
+
+def _doc_date(value: object) -> str:
+    text = str(value or "").strip()
+    return text[:10] if len(text) >= 10 else ""
+
+
+def _rows_by_code(doc: dict | None) -> dict[str, dict]:
+    """Snapshot rows keyed by code; with duplicate codes the last row wins, as the old per-code upsert did."""
+    rows = doc.get("data", []) if doc and isinstance(doc.get("data"), list) else []
+    by_code: dict[str, dict] = {}
+    for row in rows:
+        code = _row_code(row)
+        if code:
+            by_code[code] = row
+    return by_code
+
+
+def build_holding_changes(collection, target_date: str) -> dict | None:
+    """Change document for the last snapshot on or before `target_date`, or None."""
+    latest_doc = find_snapshot(collection, {"time": {"$lte": f"{target_date} 23:59:59"}})
+    latest_date = _doc_date(latest_doc.get("time")) if latest_doc else ""
+    if not latest_date:
+        return None
+    previous_doc = find_snapshot(collection, {"time": {"$lt": f"{latest_date} 00:00:00"}})
+    if not previous_doc:
+        return None
+
+    previous_map = _rows_by_code(previous_doc)
+    holdings = []
+    for code, latest_row in _rows_by_code(latest_doc).items():
+        previous_row = previous_map.get(code, {})
+        holdings.append({
+            "code": code,
+            "name": str(latest_row.get("name") or previous_row.get("name") or "").strip(),
+            "latest_holding_count": _holding_count(latest_row),
+            "previous_holding_count": _holding_count(previous_row),
+            "weight": latest_row.get("weight", previous_row.get("weight", "")),
+            "weight_num": latest_row.get("weight" + NUMERIC_SUFFIX, previous_row.get("weight" + NUMERIC_SUFFIX)),
+        })
+    return {
+        "_id": f"{collection.name}|{latest_date}",
+        "etf": collection.name,
+        "date": latest_date,
+        "previous_date": _doc_date(previous_doc.get("time")),
+        "time": latest_doc.get("time"),
+        "holdings": holdings,
+    }
+
+
+def ensure_changes_index(changes_collection) -> None:
+    changes_collection.create_index([("etf", ASCENDING), ("date", DESCENDING)])
+
+
+def materialize_holding_changes(collection, changes_collection, target_date: str) -> dict | None:
+    """Recompute and store the change document for `target_date`."""
+    doc = build_holding_changes(collection, target_date)
+    if doc is not None:
+        changes_collection.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+    return doc
+
+
+def rebuild_holding_changes(collection, changes_collection) -> int:
+    """Materialize the change document of every snapshot date in `collection`."""
+    dates = sorted({
+        _doc_date(value)
+        for value in collection.distinct("time", {"_id": {"$ne": "latest"}})
+        if _doc_date(value)
+    })
+    return sum(
+        1 for date in dates
+        if materialize_holding_changes(collection, changes_collection, date) is not None
+    )
+
+
+def find_holding_changes(changes_collection, etf_names: list[str], target_date: str) -> dict[str, dict]:
+    """Newest change document on or before `target_date` for each ETF, in one query."""
+    pipeline = [
+        {"$match": {"etf": {"$in": etf_names}, "date": {"$lte": target_date}}},
+        {"$sort": {"etf": 1, "date": -1}},
+        {"$group": {"_id": "$etf", "doc": {"$first": "$$ROOT"}}},
+    ]
+    return {item["_id"]: item["doc"] for item in changes_collection.aggregate(pipeline)}
@@ -0,0 +1,138 @@
+"""Latency of `/api/mxf` while slow upstream (LLM) requests are in flight.
+
+Measures p50/p99 of GET /api/mxf first on an idle server, then again while
+`--slow` concurrent POST /api/chat_llm requests are running:
+
+    python loadtest_market_api.py --url http://127.0.0.1:5050
+    python loadtest_market_api.py --local --slow-seconds 10   # in-process server, LLM replaced by a sleep
+
+`--local` starts mongo_market_api's PooledHTTPServer on a free port against
+MONGO_URI from .env and answers /api/chat_llm after `--slow-seconds` instead of
+calling OpenAI, so no API key is needed and the slow call is deterministic.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+from types import SimpleNamespace
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _get(url: str) -> tuple[float, int]:
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    return (time.perf_counter() - started) * 1000, status
+
+
+def _post_chat(base_url: str) -> int:
+    body = json.dumps({"stock_name": "2330", "question": "load test"}).encode("utf-8")
+    request = urllib.request.Request(
+        f"{base_url}/api/chat_llm", data=body, headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=300) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+
+
+def measure(base_url: str, requests_count: int, concurrency: int) -> dict:
+    url = f"{base_url}/api/mxf?all=1"
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: _get(url), range(requests_count)))
+    latencies = [latency for latency, status in results if status == 200]
+    errors = len(results) - len(latencies)
+    if not latencies:
+        return {"p50": float("nan"), "p99": float("nan"), "mean": float("nan"), "errors": errors}
+    return {
+        "p50": _percentile(latencies, 50),
+        "p99": _percentile(latencies, 99),
+        "mean": statistics.fmean(latencies),
+        "errors": errors,
+    }
+
+
+def _print_result(label: str, result: dict) -> None:
+    print(
+        f"{label}: p50 {result['p50']:.1f} ms / p99 {result['p99']:.1f} ms / "
+        f"mean {result['mean']:.1f} ms / 非 200 {result['errors']} 筆"
+    )
+
+
+def _start_local_server(slow_seconds: float):
+    import mongo_market_api
+
+    def slow_completion(**_kwargs):
+        time.sleep(slow_seconds)
+        message = SimpleNamespace(content="load test")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    mongo_market_api.openai_client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=slow_completion))
+    )
+    server = mongo_market_api.PooledHTTPServer(
+        ("127.0.0.1", 0), mongo_market_api.MarketApiHandler, mongo_market_api.MARKET_API_WORKERS
+    )
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5050", help="running market API base URL")
+    parser.add_argument("--local", action="store_true", help="start an in-process server with a fake slow LLM")
+    parser.add_argument("--slow-seconds", type=float, default=10, help="fake LLM latency for --local")
+    parser.add_argument("--slow", type=int, default=2, help="concurrent /api/chat_llm requests")
+    parser.add_argument("--requests", type=int, default=200, help="/api/mxf requests per phase")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent /api/mxf clients")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url.rstrip("/")
+    if args.local:
+        server, base_url = _start_local_server(args.slow_seconds)
+
+    try:
+        _get(f"{base_url}/api/mxf?all=1")
+        _print_result("閒置", measure(base_url, args.requests, args.concurrency))
+
+        slow_statuses: list[int] = []
+        slow_threads = [
+            Thread(target=lambda: slow_statuses.append(_post_chat(base_url)), daemon=True) for _ in range(args.slow)
+        ]
+        for thread in slow_threads:
+            thread.start()
+        time.sleep(0.5)
+        in_flight = sum(thread.is_alive() for thread in slow_threads)
+        _print_result(f"{in_flight} 個 LLM 請求進行中", measure(base_url, args.requests, args.concurrency))
+        if in_flight < args.slow:
+            print("⚠️ 部分 LLM 請求在量測結束前已完成，可加大 --slow-seconds")
+        for thread in slow_threads:
+            thread.join()
+        print(f"LLM 請求狀態碼: {sorted(slow_statuses)}")
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
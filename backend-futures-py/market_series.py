@@ -0,0 +1,268 @@
+"""Optional time-series storage for the per-minute tradeinfo monitors.
+
+By default monitor_mxf / monitor_stock_futures write one collection per day
+(`YYYY-MM-DD`). With MARKET_STORAGE_MODE=timeseries every document goes to one
+MongoDB time-series collection per database instead, and the market API reads
+from it; `both` writes both while the API keeps reading the day collections:
+
+    SERIES_COLLECTION  timeField "time" (BSON date, UTC), metaField "source"
+
+so a multi-day range is one query instead of one query per day collection.
+Documents keep their original fields; readers get `time` back as the usual
+"%Y-%m-%d %H:%M:%S" Asia/Taipei string.
+
+    python market_series.py    # backfill the series from existing day collections
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator
+from zoneinfo import ZoneInfo
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import CollectionInvalid
+
+from date_collections import is_date_collection
+from mongo_pool import get_mongo_client
+
+SERIES_COLLECTION = "tradeinfo_series"
+SERIES_GRANULARITY = "minutes"
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+TZ = ZoneInfo("Asia/Taipei")
+BACKFILL_BATCH_SIZE = 1000
+
+# 資料庫 -> 來源 API（寫入 metaField）
+MXF_DB_NAME = "mxf_futures"
+MXF_SOURCE = "chip960_tradeinfo"
+STKFUT_DB_NAME = "stock_futures"
+STKFUT_SOURCE = "stkfut_tradeinfo"
+SERIES_SOURCES = {MXF_DB_NAME: MXF_SOURCE, STKFUT_DB_NAME: STKFUT_SOURCE}
+
+_ready: set[str] = set()
+
+
+def storage_mode() -> str:
+    """MARKET_STORAGE_MODE: "daily" (default), "timeseries" or "both" (write both, read daily).
+
+    Read on every call because the monitors load .env after their imports.
+    """
+    return os.getenv("MARKET_STORAGE_MODE", "daily").strip().lower()
+
+
+def writes_daily() -> bool:
+    return storage_mode() in ("daily", "both")
+
+
+def writes_series() -> bool:
+    return storage_mode() in ("timeseries", "both")
+
+
+def reads_series() -> bool:
+    return storage_mode() == "timeseries"
+
+
+def parse_time(value: object) -> datetime | None:
+    """Taipei "%Y-%m-%d %H:%M:%S" text (or a datetime) -> aware UTC datetime."""
+    if isinstance(value, datetime):
+        moment = value if value.tzinfo else value.replace(tzinfo=TZ)
+        return moment.astimezone(timezone.utc)
+    text = str(value or "").strip()
+    for fmt in (TIME_FORMAT, "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt).replace(tzinfo=TZ).astimezone(timezone.utc)
+        except ValueError:
+            continue
+    return None
+
+
+def format_time(value: object) -> str:
+    if not isinstance(value, datetime):
+        return str(value or "")
+    moment = value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return moment.astimezone(TZ).strftime(TIME_FORMAT)
+
+
+def day_range(date_str: str) -> tuple[datetime, datetime]:
+    start = parse_time(date_str)
+    if start is None:
+        raise ValueError(f"Invalid date: {date_str}")
+    return start, start + timedelta(days=1)
+
+
+def get_series_collection(db):
+    """The database's time-series collection, created on first use."""
+    collection = db[SERIES_COLLECTION]
+    if db.name in _ready:
+        return collection
+    if SERIES_COLLECTION not in db.list_collection_names():
+        try:
+            db.create_collection(
+                SERIES_COLLECTION,
+                timeseries={"timeField": "time", "metaField": "source", "granularity": SERIES_GRANULARITY},
+            )
+        except CollectionInvalid:
+            pass
+    collection.create_index([("source", ASCENDING), ("time", ASCENDING)])
+    _ready.add(db.name)
+    return collection
+
+
+def to_series_doc(doc: dict, source: str) -> dict | None:
+    moment = parse_time(doc.get("time"))
+    if moment is None:
+        return None
+    series_doc = {key: value for key, value in doc.items() if key != "_id"}
+    series_doc["time"] = moment
+    series_doc["source"] = source
+    return series_doc
+
+
+def from_series_doc(doc: dict) -> dict:
+    plain = {key: value for key, value in doc.items() if key not in ("_id", "source")}
+    plain["time"] = format_time(doc.get("time"))
+    return plain
+
+
+def insert_series(db, source: str, docs: list[dict]) -> int:
+    """Insert `docs` into the series and return how many were written.
+
+    Documents whose `time` cannot be parsed are not written; they are counted
+    and reported so a format change upstream does not go unnoticed.
+    """
+    series_docs, unparsed = [], []
+    for doc in docs:
+        series_doc = to_series_doc(doc, source)
+        if series_doc is None:
+            unparsed.append(doc.get("time"))
+        else:
+            series_docs.append(series_doc)
+    if unparsed:
+        print(f"⚠️ {db.name} {source} 有 {len(unparsed)} 筆 time 無法解析，未寫入 time-series: {unparsed[:3]!r}")
+    if series_docs:
+        get_series_collection(db).insert_many(series_docs, ordered=False)
+    return len(series_docs)
+
+
+def _range_query(source: str, start: datetime | None, end: datetime | None, after: datetime | None) -> dict:
+    time_query = {}
+    if start is not None:
+        time_query["$gte"] = start
+    if after is not None:
+        time_query["$gt"] = after
+    if end is not None:
+        time_query["$lt"] = end
+    query: dict = {"source": source}
+    if time_query:
+        query["time"] = time_query
+    return query
+
+
+def find_series(
+    db,
+    source: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    after: datetime | None = None,
+) -> Iterator[dict]:
+    """Documents of `source` in [start, end) and strictly after `after`, oldest first, streamed from the cursor."""
+    # 同一分鐘的多筆資料依寫入順序（_id）排列，與日集合的 (time, _id) 排序一致
+    cursor = get_series_collection(db).find(_range_query(source, start, end, after)).sort(
+        [("time", ASCENDING), ("_id", ASCENDING)]
+    )
+    for doc in cursor:
+        yield from_series_doc(doc)
+
+
+def find_latest(db, source: str, start: datetime | None = None, end: datetime | None = None) -> dict | None:
+    """Newest document of `source` in [start, end); the last written one when several share that time."""
+    collection = get_series_collection(db)
+    newest = collection.find_one(_range_query(source, start, end, None), {"time": 1}, sort=[("time", DESCENDING)])
+    if not newest:
+        return None
+    doc = collection.find_one({"source": source, "time": newest["time"]}, sort=[("_id", DESCENDING)])
+    return from_series_doc(doc) if doc else None
+
+
+def series_version(db, source: str, start: datetime | None = None, end: datetime | None = None) -> tuple:
+    """(document count, newest time) of `source` in [start, end), read from the index only."""
+    collection = get_series_collection(db)
+    query = _range_query(source, start, end, None)
+    newest = collection.find_one(query, {"time": 1, "_id": 0}, sort=[("time", DESCENDING)])
+    return collection.count_documents(query), newest["time"] if newest else None
+
+
+def backfill_from_day_collections(db, source: str) -> int:
+    """Copy every day collection into the series.
+
+    Documents whose `time` the series already holds for that day are skipped
+    (per occurrence), so reruns, interrupted runs and days already written by
+    MARKET_STORAGE_MODE=both do not create duplicates.
+    """
+    collection = get_series_collection(db)
+    inserted = 0
+    for name in sorted(name for name in db.list_collection_names() if is_date_collection(name)):
+        start, end = day_range(name)
+        existing = Counter(
+            doc["time"].replace(tzinfo=None) if isinstance(doc.get("time"), datetime) else doc.get("time")
+            for doc in collection.find({"source": source, "time": {"$gte": start, "$lt": end}}, {"time": 1})
+        )
+        batch, count, unparsed = [], 0, 0
+        for doc in db[name].find().sort([("time", ASCENDING), ("_id", ASCENDING)]):
+            series_doc = to_series_doc(doc, source)
+            if series_doc is None:
+                unparsed += 1
+                continue
+            key = series_doc["time"].replace(tzinfo=None)
+            if existing[key] > 0:
+                existing[key] -= 1
+                continue
+            batch.append(series_doc)
+            if len(batch) >= BACKFILL_BATCH_SIZE:
+                collection.insert_many(batch, ordered=False)
+                count += len(batch)
+                batch = []
+        if batch:
+            collection.insert_many(batch, ordered=False)
+            count += len(batch)
+        if count:
+            print(f"✅ {db.name}.{name} 回填 {count} 筆")
+        if unparsed:
+            print(f"⚠️ {db.name}.{name} 有 {unparsed} 筆 time 無法解析，未回填")
+        inserted += count
+    return inserted
+
+
+def load_env_file(path: str) -> None:
+    env_path = Path(path)
+    if not env_path.exists():
+        return
+
+    for line in env_path.read_text().splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#") or "=" not in stripped:
+            continue
+
+        key, value = stripped.split("=", 1)
+        os.environ.setdefault(key.strip(), value.strip().strip('"').strip("'"))
+
+
+def main() -> int:
+    load_env_file(str(Path(__file__).resolve().parent / ".env"))
+    mongo_uri = os.getenv("MONGO_URI")
+    if not mongo_uri:
+        print("❌ Missing required environment variable: MONGO_URI")
+        return 1
+    client = get_mongo_client(mongo_uri)
+    for db_name, source in SERIES_SOURCES.items():
+        total = backfill_from_day_collections(client[db_name], source)
+        print(f"✅ {db_name}.{SERIES_COLLECTION} 共回填 {total} 筆")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""One-off backfill of `<field>_num` values into documents written before numeric_fields.
+
+Safe to run more than once: every run recomputes the typed fields from the
+text fields and only writes documents whose typed fields differ.
+
+    python migrate_numeric_fields.py
+"""
+
+import os
+import sys
+from pathlib import Path
+
+from pymongo import UpdateOne
+
+from date_collections import is_date_collection
+from mongo_pool import get_mongo_client
+from numeric_fields import (
+    TURNOVER_NUMERIC_FIELDS,
+    TV_NUMERIC_FIELDS,
+    with_holding_numbers,
+    with_numeric_fields,
+    with_tv_numbers,
+)
+
+
+def load_env_file(path: str) -> None:
+    env_path = Path(path)
+    if not env_path.exists():
+        return
+
+    for line in env_path.read_text().splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#") or "=" not in stripped:
+            continue
+
+        key, value = stripped.split("=", 1)
+        os.environ.setdefault(key.strip(), value.strip().strip('"').strip("'"))
+
+
+def require_env(name: str) -> str:
+    value = os.getenv(name)
+    if not value:
+        raise RuntimeError(f"Missing required environment variable: {name}")
+    return value
+
+
+ENV_PATH = Path(__file__).resolve().parent / ".env"
+ETF_DB_NAME = "Investment"
+ETF_HOLDING_COLLECTIONS = ["etf_00981A", "etf_00982A", "etf_00991A", "etf_00992A"]
+ETF_COMMON_TECH_COLLECTION = "etf_Initiative_tech"
+FUTURE_INDEX_DB_NAME = "FutureIndex"
+FUTURE_INDEX_COLLECTION = "index"
+WANTGOO_DB_NAME = "yahoo_turnover_tech"
+BATCH_SIZE = 500
+
+
+def _typed_rows(rows: object, convert) -> object:
+    if not isinstance(rows, list):
+        return rows
+    return [convert(row) if isinstance(row, dict) else row for row in rows]
+
+
+def _holding_updates(doc: dict) -> dict:
+    """`$set` for an ETF history document: base rows, delta rows and delta changes."""
+    updates = {}
+    for key in ("data", "added"):
+        if key in doc:
+            updates[key] = _typed_rows(doc[key], with_holding_numbers)
+    if isinstance(doc.get("changed"), dict):
+        updates["changed"] = {
+            code: with_holding_numbers(fields) if isinstance(fields, dict) else fields
+            for code, fields in doc["changed"].items()
+        }
+    return {key: value for key, value in updates.items() if doc.get(key) != value}
+
+
+def _tv_rows_updates(doc: dict) -> dict:
+    """`$set` for an `_id: "latest"` document whose `data` holds TradingView rows."""
+    if "data" not in doc:
+        return {}
+    data = _typed_rows(doc["data"], with_tv_numbers)
+    return {"data": data} if data != doc["data"] else {}
+
+
+def _wantgoo_updates(doc: dict) -> dict:
+    """`$set` for one per-code turnover tech document."""
+    typed = with_numeric_fields(doc, TURNOVER_NUMERIC_FIELDS + TV_NUMERIC_FIELDS)
+    return {key: value for key, value in typed.items() if key not in doc or doc[key] != value}
+
+
+def migrate_collection(collection, build_updates) -> int:
+    operations = []
+    updated = 0
+    for doc in collection.find():
+        updates = build_updates(doc)
+        if not updates:
+            continue
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": updates}))
+        if len(operations) >= BATCH_SIZE:
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += collection.bulk_write(operations, ordered=False).modified_count
+    print(f"✅ {collection.database.name}.{collection.name} 更新 {updated} 筆")
+    return updated
+
+
+def main() -> int:
+    load_env_file(str(ENV_PATH))
+    client = get_mongo_client(require_env("MONGO_URI"))
+
+    etf_db = client[ETF_DB_NAME]
+    for collection_name in ETF_HOLDING_COLLECTIONS:
+        migrate_collection(etf_db[collection_name], _holding_updates)
+    migrate_collection(etf_db[ETF_COMMON_TECH_COLLECTION], _tv_rows_updates)
+    migrate_collection(client[FUTURE_INDEX_DB_NAME][FUTURE_INDEX_COLLECTION], _tv_rows_updates)
+
+    wantgoo_db = client[WANTGOO_DB_NAME]
+    for collection_name in sorted(filter(is_date_collection, wantgoo_db.list_collection_names())):
+        migrate_collection(wantgoo_db[collection_name], _wantgoo_updates)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,48 @@
 import os
+import gzip
+import hashlib
 import json
+import zlib
+from collections import OrderedDict
 from datetime import datetime
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from urllib.parse import parse_qs, urlparse
 import re
+import time
+from bisect import bisect_left
+from threading import BoundedSemaphore, Lock
 from zoneinfo import ZoneInfo
 
 import requests
-from pymongo import MongoClient, DESCENDING
+
+from date_collections import (
+    LATEST_KEY_PROJECTION,
+    LATEST_SORT,
+    DateCollections,
+    check_latest_lookup,
+    ensure_time_index,
+    find_latest_doc,
+)
+from etf_history import (
+    ETF_CHANGES_COLLECTION,
+    build_holding_changes,
+    ensure_changes_index,
+    find_holding_changes,
+)
+from market_series import (
+    MXF_SOURCE,
+    STKFUT_SOURCE,
+    day_range,
+    find_latest,
+    find_series,
+    parse_time,
+    reads_series,
+    series_version,
+)
+from mongo_pool import get_mongo_client, get_mongo_pool_stats, ping_mongo
+from snapshot_stream import SnapshotHub
 
 
 def load_env_file(path: str = ".env") -> None:
@@ -51,12 +85,47 @@ TZ = ZoneInfo("Asia/Taipei")
 DEFAULT_DISCORD_WEBHOOK_URL = (os.getenv("WEBHOOK_URL") or os.getenv("DISCORD_ETF_CROSS") or "").strip()
 PRICE_UP_JSON_PATH = Path(__file__).resolve().parent / "tv_doc" / "priceUp.json"
 
-mongo_client = MongoClient(MONGO_URI)
+mongo_client = get_mongo_client(MONGO_URI)
 
-from openai import OpenAI
+from openai import APITimeoutError, OpenAI
 from auto_trade_IntradayOdd import place_intraday_odd_lot
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-openai_client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+MARKET_API_WORKERS = int(os.getenv("MARKET_API_WORKERS", "16"))
+UPSTREAM_WORKERS = int(os.getenv("MARKET_API_UPSTREAM_WORKERS", "4"))
+# 上游呼叫名額全滿時最多等待的秒數，逾時回 503
+UPSTREAM_WAIT_SECONDS = float(os.getenv("MARKET_API_UPSTREAM_WAIT_SECONDS", "5"))
+# 工作執行緒全忙時最多排隊的連線數，超過直接回 503
+MARKET_API_QUEUE_SIZE = int(os.getenv("MARKET_API_QUEUE_SIZE", "64"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+DISCORD_TIMEOUT_SECONDS = float(os.getenv("DISCORD_TIMEOUT_SECONDS", "20"))
+# 逾時由 HTTP client 本身中止；不自動重試，避免逾時後重送
+openai_client = (
+    OpenAI(api_key=OPENAI_API_KEY, timeout=LLM_TIMEOUT_SECONDS, max_retries=0) if OPENAI_API_KEY else None
+)
+
+# Slow third-party calls (OpenAI, Discord) are bounded by their own client
+# timeouts; this semaphore only keeps them from occupying more than
+# UPSTREAM_WORKERS request threads at once.
+upstream_slots = BoundedSemaphore(UPSTREAM_WORKERS)
+
+
+class UpstreamBusyError(RuntimeError):
+    """All upstream slots stayed taken for UPSTREAM_WAIT_SECONDS."""
+
+
+def run_upstream(func, *args, **kwargs):
+    """Run a slow upstream call on the request thread, at most UPSTREAM_WORKERS at a time.
+
+    Client timeouts surface as TimeoutError; the call has really stopped by then.
+    """
+    if not upstream_slots.acquire(timeout=UPSTREAM_WAIT_SECONDS):
+        raise UpstreamBusyError("Too many upstream requests in flight")
+    try:
+        return func(*args, **kwargs)
+    except (requests.Timeout, APITimeoutError) as exc:
+        raise TimeoutError(f"Upstream call timed out: {exc}") from None
+    finally:
+        upstream_slots.release()
 
 
 def get_collection_name(date_str: str | None) -> str:
@@ -65,31 +134,93 @@ def get_collection_name(date_str: str | None) -> str:
     return datetime.now(TZ).strftime("%Y-%m-%d")
 
 
-def fetch_latest_payload(date_str: str | None) -> dict:
-    collection_name = get_collection_name(date_str)
-    collection = mongo_client[DB_NAME][collection_name]
-    doc = collection.find_one(sort=[("time", DESCENDING), ("_id", DESCENDING)])
-    if not doc:
-        return {}
+def _parse_range_bound(value: str | None, is_end: bool = False):
+    """API `start` / `end` ("YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS"); a bare end date includes that day."""
+    if not value:
+        return None
+    moment = parse_time(value)
+    if moment is None:
+        raise ValueError(f"Invalid time: {value}")
+    if is_end and len(value.strip()) == 10:
+        moment = day_range(value.strip())[1]
+    return moment
+
+
+def _range_day_names(db, start: str | None, end: str | None) -> list[str]:
+    """Day collections overlapping [start, end] for reads in the per-day storage mode."""
+    return [
+        name
+        for name in date_collections[db.name].names()
+        if (not start or name >= start[:10]) and (not end or name <= end[:10])
+    ]
 
-    doc.pop("_id", None)
-    doc.pop("time", None)
-    return doc
+
+def fetch_latest_payload(date_str: str | None, start: str | None = None, end: str | None = None) -> dict:
+    """Latest stock futures snapshot of a day, or of the `start` / `end` range when given."""
+    if reads_series():
+        if start or end:
+            range_start, range_end = _parse_range_bound(start), _parse_range_bound(end, is_end=True)
+        else:
+            range_start, range_end = day_range(get_collection_name(date_str))
+        doc = find_latest(mongo_client[DB_NAME], STKFUT_SOURCE, range_start, range_end)
+        if not doc:
+            return {}
+        doc.pop("time", None)
+        return doc
+
+    db = mongo_client[DB_NAME]
+    if start or end:
+        collection_names = list(reversed(_range_day_names(db, start, end)))
+        time_query = {}
+        if start:
+            time_query["$gte"] = start
+        if end:
+            time_query["$lte"] = f"{end} 23:59:59" if len(end) == 10 else end
+        query = {"time": time_query}
+    else:
+        collection_names = [get_collection_name(date_str)]
+        query = {}
+
+    for collection_name in collection_names:
+        doc = find_latest_doc(db[collection_name], query)
+        if doc:
+            doc.pop("_id", None)
+            doc.pop("time", None)
+            return doc
+    return {}
+
+
+# 依日期命名的集合清單（定期刷新），新出現的集合順便建立 time 索引
+date_collections = {
+    db_name: DateCollections(mongo_client[db_name], index_time=True)
+    for db_name in (DB_NAME, MXF_DB_NAME)
+}
 
 
 def _get_latest_collection_name(db) -> str | None:
-    candidates = [
-        name
-        for name in db.list_collection_names()
-        if len(name) == 10 and name[4] == "-" and name[7] == "-"
-    ]
-    return max(candidates) if candidates else None
+    return date_collections[db.name].latest()
+
+
+def prepare_date_collections() -> None:
+    """Index every existing day collection and verify the latest-document lookup plan."""
+    for db_name, collections in date_collections.items():
+        try:
+            latest = collections.names(refresh=True)[-1:]
+            for name in latest:
+                check_latest_lookup(mongo_client[db_name][name])
+        except Exception as exc:
+            print(f"⚠️ 無法檢查 {db_name} 日期集合索引: {exc}")
+
+
+MXF_LATEST_PROJECTION = {"_id": 0, "time": 1, "tx_bvav": 1, "mtx_tbta": 1, "mtx_bvav": 1}
 
 
 def fetch_latest_mxf(date_str: str | None) -> dict:
     collection_name = get_collection_name(date_str)
-    collection = mongo_client[MXF_DB_NAME][collection_name]
-    doc = collection.find_one(sort=[("time", DESCENDING), ("_id", DESCENDING)])
+    if reads_series():
+        doc = find_latest(mongo_client[MXF_DB_NAME], MXF_SOURCE, *day_range(collection_name))
+    else:
+        doc = find_latest_doc(mongo_client[MXF_DB_NAME][collection_name], projection=MXF_LATEST_PROJECTION)
     if not doc:
         return {}
 
@@ -111,34 +242,194 @@ def _get_mxf_signal(tx_bvav: float | None, mtx_bvav: float | None, mtx_tbta: flo
     return "none"
 
 
-def fetch_mxf_series(date_str: str | None) -> dict:
+def _mxf_row(doc: dict) -> dict:
+    tx_bvav = doc.get("tx_bvav")
+    mtx_bvav = doc.get("mtx_bvav")
+    mtx_tbta = doc.get("mtx_tbta")
+    return {
+        "time": doc.get("time"),
+        "tx_bvav": tx_bvav,
+        "mtx_bvav": mtx_bvav,
+        "mtx_tbta": mtx_tbta,
+        "signal": _get_mxf_signal(tx_bvav, mtx_bvav, mtx_tbta),
+    }
+
+
+class MxfSeriesCache:
+    """Already-computed `/api/mxf?all=1` rows per day collection.
+
+    Each refresh only reads documents at or after the last cached `time`, so
+    a poll costs the size of the delta rather than the whole session.
+
+    Appends are all it sees directly. When the collection's document count no
+    longer matches the cached rows (a late row with an older `time`, or a
+    delete) the day is reloaded from scratch. In-place updates of documents
+    already cached are not detected; they show up once the day is evicted or
+    the process restarts.
+    """
+
+    def __init__(self, max_collections: int = 4) -> None:
+        self._series: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = Lock()
+        self._max_collections = max_collections
+
+    def refresh(self, db, collection_name: str, since: str | None = None) -> tuple[list[dict], str]:
+        """Pull new documents, then return the rows at or after `since` and the next cursor.
+
+        Rows at exactly `since` are sent again so a row written later in the
+        same second is not lost; the client replaces its rows from `since` on.
+        """
+        with self._lock:
+            series = self._series.get(collection_name)
+            if series is None:
+                series = self._new_series()
+                self._series[collection_name] = series
+            self._series.move_to_end(collection_name)
+            while len(self._series) > self._max_collections:
+                self._series.popitem(last=False)
+
+            collection = db[collection_name]
+            self._pull(collection, series)
+            if series["rows"]:
+                # Only index collections that exist; create_index would create empty ones.
+                ensure_time_index(collection)
+                if collection.estimated_document_count() != len(series["rows"]):
+                    # 較舊時間的補寫或刪除不會出現在增量查詢裡，整天重新載入
+                    series = self._new_series()
+                    self._series[collection_name] = series
+                    self._pull(collection, series)
+
+            start = bisect_left(series["times"], since) if since else 0
+            return series["rows"][start:], series["cursor"]
+
+    @staticmethod
+    def _new_series() -> dict:
+        return {"rows": [], "times": [], "cursor": "", "cursor_ids": set()}
+
+    @staticmethod
+    def _pull(collection, series: dict) -> None:
+        """Append the documents at or after the series cursor that are not cached yet."""
+        query = {"time": {"$gte": series["cursor"]}} if series["cursor"] else {}
+        for doc in collection.find(query).sort([("time", 1), ("_id", 1)]):
+            doc_id = doc.pop("_id", None)
+            doc_time = doc.get("time")
+            if doc_time == series["cursor"] and doc_id in series["cursor_ids"]:
+                continue
+            series["rows"].append(_mxf_row(doc))
+            series["times"].append(str(doc_time or ""))
+            if doc_time != series["cursor"]:
+                series["cursor"] = doc_time
+                series["cursor_ids"] = set()
+            series["cursor_ids"].add(doc_id)
+
+
+mxf_series_cache = MxfSeriesCache()
+
+
+def _later_bound(*bounds):
+    """The latest of the given lower bounds, ignoring missing ones."""
+    present = [bound for bound in bounds if bound]
+    return max(present) if present else None
+
+
+def _fetch_mxf_series_range(db, start: str | None, end: str | None, since: str | None) -> dict:
+    """MXF rows across days: one time-series query, or one query per day collection."""
+    label = f"{start or ''}~{end or ''}"
+    if reads_series():
+        docs = find_series(
+            db,
+            MXF_SOURCE,
+            _later_bound(_parse_range_bound(start), _parse_range_bound(since)),
+            _parse_range_bound(end, is_end=True),
+        )
+    else:
+        time_query = {}
+        lower = _later_bound(start, since)
+        if lower:
+            time_query["$gte"] = lower
+        if end:
+            time_query["$lte"] = f"{end} 23:59:59" if len(end) == 10 else end
+        query = {"time": time_query} if time_query else {}
+        docs = []
+        for collection_name in _range_day_names(db, start, end):
+            docs.extend(db[collection_name].find(query, {"_id": 0}).sort([("time", 1), ("_id", 1)]))
+    rows = [_mxf_row(doc) for doc in docs]
+    cursor = rows[-1]["time"] if rows else since or ""
+    return {"data": rows, "collection_name": label, "cursor": cursor}
+
+
+def _fetch_mxf_series_day(db, date_str: str | None, since: str | None) -> dict:
+    collection_name = get_collection_name(date_str)
+    day_start, day_end = day_range(collection_name)
+    rows = [
+        _mxf_row(doc)
+        for doc in find_series(db, MXF_SOURCE, _later_bound(day_start, _parse_range_bound(since)), day_end)
+    ]
+    if not rows and not since:
+        latest = find_latest(db, MXF_SOURCE)
+        if not latest:
+            return {}
+        collection_name = latest["time"][:10]
+        rows = [_mxf_row(doc) for doc in find_series(db, MXF_SOURCE, *day_range(collection_name))]
+    cursor = rows[-1]["time"] if rows else since or ""
+    return {"data": rows, "collection_name": collection_name, "cursor": cursor}
+
+
+def fetch_mxf_series(
+    date_str: str | None,
+    since: str | None = None,
+    start: str | None = None,
+    end: str | None = None,
+) -> dict:
+    """Return the MXF series for a day; with `since`, only rows at or after that time.
+
+    Rows at the `since` second itself are returned again, so clients replace
+    their rows from `since` on instead of appending. `start` / `end` select an
+    arbitrary range across days instead of a single day.
+    """
     db = mongo_client[MXF_DB_NAME]
+    if start or end:
+        return _fetch_mxf_series_range(db, start, end, since)
+    if reads_series():
+        return _fetch_mxf_series_day(db, date_str, since)
+
     collection_name = get_collection_name(date_str) if date_str else None
-    docs = []
+    rows, cursor = [], ""
     if collection_name:
-        docs = list(db[collection_name].find({}, {"_id": 0}).sort("time", 1))
+        rows, cursor = mxf_series_cache.refresh(db, collection_name, since)
 
-    if not docs:
+    if not cursor:
         fallback_name = _get_latest_collection_name(db)
         if not fallback_name:
             return {}
-        docs = list(db[fallback_name].find({}, {"_id": 0}).sort("time", 1))
+        rows, cursor = mxf_series_cache.refresh(db, fallback_name, since)
         collection_name = fallback_name
 
-    data = []
-    for doc in docs:
-        tx_bvav = doc.get("tx_bvav")
-        mtx_bvav = doc.get("mtx_bvav")
-        mtx_tbta = doc.get("mtx_tbta")
-        data.append({
-            "time": doc.get("time"),
-            "tx_bvav": tx_bvav,
-            "mtx_bvav": mtx_bvav,
-            "mtx_tbta": mtx_tbta,
-            "signal": _get_mxf_signal(tx_bvav, mtx_bvav, mtx_tbta),
-        })
+    return {"data": rows, "collection_name": collection_name, "cursor": cursor or since or ""}
 
-    return {"data": data, "collection_name": collection_name}
+
+def _day_collection_version(collection) -> tuple:
+    newest = collection.find_one({}, LATEST_KEY_PROJECTION, sort=LATEST_SORT)
+    if not newest:
+        return (collection.name, 0, None, None)
+    return (collection.name, collection.estimated_document_count(), newest.get("time"), newest["_id"])
+
+
+def mxf_series_version(date_str: str | None, start: str | None = None, end: str | None = None) -> tuple:
+    """Changes whenever fetch_mxf_series' answer can change; costs a few index lookups, not the series."""
+    db = mongo_client[MXF_DB_NAME]
+    if reads_series():
+        if start or end:
+            return series_version(db, MXF_SOURCE, _parse_range_bound(start), _parse_range_bound(end, is_end=True))
+        latest = find_latest(db, MXF_SOURCE)
+        day_version = series_version(db, MXF_SOURCE, *day_range(get_collection_name(date_str)))
+        return day_version, latest.get("time") if latest else None
+    if start or end:
+        names = _range_day_names(db, start, end)
+    else:
+        # 指定日期沒有資料時會改讀最新的日集合，兩者都列入版本
+        names = [get_collection_name(date_str), _get_latest_collection_name(db)]
+    return tuple(_day_collection_version(db[name]) for name in dict.fromkeys(name for name in names if name))
 
 
 def fetch_etf_holdings_counts() -> dict:
@@ -229,34 +520,6 @@ def fetch_future_index_tech() -> dict:
     }
 
 
-def _parse_holding_count(value: object) -> int:
-    try:
-        return int(float(str(value).replace(",", "").strip()))
-    except (TypeError, ValueError):
-        return 0
-
-
-def _doc_date(value: object) -> str:
-    text = str(value or "").strip()
-    return text[:10] if len(text) >= 10 else ""
-
-
-def _find_latest_doc_for_date(collection, target_date: str) -> dict | None:
-    cursor = collection.find(
-        {"time": {"$lte": f"{target_date} 23:59:59"}},
-        {"_id": 0},
-    ).sort([("time", DESCENDING), ("_id", DESCENDING)]).limit(1)
-    return next(iter(cursor), None)
-
-
-def _find_previous_doc_before_date(collection, latest_date: str) -> dict | None:
-    cursor = collection.find(
-        {"time": {"$lt": f"{latest_date} 00:00:00"}},
-        {"_id": 0},
-    ).sort([("time", DESCENDING), ("_id", DESCENDING)]).limit(1)
-    return next(iter(cursor), None)
-
-
 def _format_count(value: int) -> str:
     return f"{value:,}"
 
@@ -292,15 +555,42 @@ def _load_price_up_index() -> dict[str, set[str]]:
     return index
 
 
+_price_up_lookup_cache: tuple[tuple, dict[str, str]] | None = None
+_price_up_lookup_lock = Lock()
+
+
+def _get_price_up_version() -> tuple:
+    try:
+        stat = PRICE_UP_JSON_PATH.stat()
+    except OSError:
+        return ()
+    return (stat.st_mtime_ns, stat.st_size)
+
+
 def _build_price_up_lookup() -> dict[str, str]:
-    index = _load_price_up_index()
-    lookup: dict[str, str] = {}
-    for date_key, codes in index.items():
-        for code in codes:
-            current = lookup.get(code)
-            if not current or date_key > current:
-                lookup[code] = date_key
-    return lookup
+    """Return code -> latest priceUp date, re-parsing the JSON only when the file changes.
+
+    The returned dict is shared between callers and must not be modified.
+    """
+    global _price_up_lookup_cache
+    version = _get_price_up_version()
+    cached = _price_up_lookup_cache
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with _price_up_lookup_lock:
+        cached = _price_up_lookup_cache
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        index = _load_price_up_index()
+        lookup: dict[str, str] = {}
+        for date_key, codes in index.items():
+            for code in codes:
+                current = lookup.get(code)
+                if not current or date_key > current:
+                    lookup[code] = date_key
+        _price_up_lookup_cache = (version, lookup)
+        return lookup
 
 
 def _find_price_up_date(code: str) -> str:
@@ -362,63 +652,44 @@ def _normalize_etf_names(raw_values: list[str]) -> list[str]:
     return normalized
 
 
-def fetch_etf_holding_changes(date_str: str | None, etf_names: list[str]) -> dict:
-    db = mongo_client[ETF_DB_NAME]
-    target_date = date_str or datetime.now(TZ).strftime("%Y-%m-%d")
-    selected_etfs = _normalize_etf_names(etf_names)
-    if not selected_etfs:
-        selected_etfs = ["etf_00981A"]
-    price_up_lookup = _build_price_up_lookup()
+def _get_changes_collection():
+    return mongo_client[ETF_DB_NAME][ETF_CHANGES_COLLECTION]
 
-    per_etf_payload: list[dict] = []
-    latest_date = ""
-    previous_date = ""
 
-    for etf_name in selected_etfs:
-        collection = db[etf_name]
-        latest_doc = _find_latest_doc_for_date(collection, target_date)
-        if not latest_doc:
-            continue
+def prepare_changes_index() -> None:
+    """Index the materialized holding changes once at startup."""
+    try:
+        ensure_changes_index(_get_changes_collection())
+    except Exception as exc:
+        print(f"⚠️ 無法建立 {ETF_DB_NAME}.{ETF_CHANGES_COLLECTION} 索引: {exc}")
 
-        current_latest_date = _doc_date(latest_doc.get("time"))
-        previous_doc = _find_previous_doc_before_date(collection, current_latest_date) if current_latest_date else None
-        if not previous_doc:
-            continue
 
-        latest_rows = latest_doc.get("data", []) if isinstance(latest_doc.get("data", []), list) else []
-        previous_rows = previous_doc.get("data", []) if isinstance(previous_doc.get("data", []), list) else []
+def _selected_etfs(etf_names: list[str]) -> list[str]:
+    return _normalize_etf_names(etf_names) or ["etf_00981A"]
 
-        latest_map: dict[str, dict] = {}
-        previous_map: dict[str, dict] = {}
 
-        for row in latest_rows:
-            if not isinstance(row, dict):
-                continue
-            code = str(row.get("code", "")).strip()
-            if not code:
-                continue
-            latest_map[code] = row
+def etf_holding_changes_version(date_str: str | None, etf_names: list[str]) -> tuple:
+    """Target date, the selected ETFs' `latest` snapshot times and the priceUp file version."""
+    target_date = date_str or datetime.now(TZ).strftime("%Y-%m-%d")
+    sources = [(ETF_DB_NAME, etf_name) for etf_name in _selected_etfs(etf_names)]
+    return target_date, _get_latest_source_version(sources), _get_price_up_version()
 
-        for row in previous_rows:
-            if not isinstance(row, dict):
-                continue
-            code = str(row.get("code", "")).strip()
-            if not code:
-                continue
-            previous_map[code] = row
-
-        per_etf_payload.append({
-            "etf": etf_name,
-            "latest_date": current_latest_date,
-            "previous_date": _doc_date(previous_doc.get("time")),
-            "latest_map": latest_map,
-            "previous_map": previous_map,
-        })
 
-        if not latest_date:
-            latest_date = current_latest_date
-        if not previous_date:
-            previous_date = _doc_date(previous_doc.get("time"))
+def fetch_etf_holding_changes(date_str: str | None, etf_names: list[str]) -> dict:
+    db = mongo_client[ETF_DB_NAME]
+    target_date = date_str or datetime.now(TZ).strftime("%Y-%m-%d")
+    selected_etfs = _selected_etfs(etf_names)
+    price_up_lookup = _build_price_up_lookup()
+
+    change_docs = find_holding_changes(_get_changes_collection(), selected_etfs, target_date)
+    per_etf_payload: list[dict] = []
+    for etf_name in selected_etfs:
+        doc = change_docs.get(etf_name)
+        if doc is None:
+            # 增減表尚未建立（monitor 還沒寫入過）時，直接從歷史快照計算
+            doc = build_holding_changes(db[etf_name], target_date)
+        if doc:
+            per_etf_payload.append(doc)
 
     if not per_etf_payload:
         return {
@@ -427,10 +698,13 @@ def fetch_etf_holding_changes(date_str: str | None, etf_names: list[str]) -> dic
             "previous_date": "",
         }
 
-    common_codes = None
-    for payload in per_etf_payload:
-        latest_codes = set(payload["latest_map"].keys())
-        common_codes = latest_codes if common_codes is None else common_codes & latest_codes
+    latest_date = per_etf_payload[0]["date"]
+    previous_date = per_etf_payload[0]["previous_date"]
+    holdings_maps = [
+        {holding["code"]: holding for holding in payload.get("holdings", [])}
+        for payload in per_etf_payload
+    ]
+    common_codes = set(holdings_maps[0]).intersection(*holdings_maps[1:])
 
     if not common_codes:
         return {
@@ -445,18 +719,12 @@ def fetch_etf_holding_changes(date_str: str | None, etf_names: list[str]) -> dic
         etf_details: list[dict] = []
         total_latest = 0
         total_previous = 0
-        total_delta = 0
         display_name = ""
 
-        for payload in per_etf_payload:
-            etf_name = payload["etf"]
-            latest_map = payload["latest_map"]
-            previous_map = payload["previous_map"]
-
-            latest_row = latest_map.get(code, {})
-            previous_row = previous_map.get(code, {})
-            latest_count = _parse_holding_count(latest_row.get("holding_count"))
-            previous_count = _parse_holding_count(previous_row.get("holding_count"))
+        for payload, holdings in zip(per_etf_payload, holdings_maps):
+            holding = holdings[code]
+            latest_count = holding["latest_holding_count"]
+            previous_count = holding["previous_holding_count"]
             delta = latest_count - previous_count
             status = (
                 "新增" if previous_count == 0 and latest_count > 0
@@ -466,21 +734,22 @@ def fetch_etf_holding_changes(date_str: str | None, etf_names: list[str]) -> dic
             )
 
             if not display_name:
-                display_name = str(latest_row.get("name") or previous_row.get("name") or "").strip()
+                display_name = holding.get("name", "")
 
             total_latest += latest_count
             total_previous += previous_count
-            total_delta += delta
 
             etf_details.append({
-                "etf": etf_name,
+                "etf": payload["etf"],
                 "latest_holding_count": latest_count,
                 "previous_holding_count": previous_count,
                 "delta": delta,
-                "weight": latest_row.get("weight", previous_row.get("weight", "")),
+                "weight": holding.get("weight", ""),
+                "weight_num": holding.get("weight_num"),
                 "status": "持平" if delta == 0 else status,
             })
 
+        total_delta = total_latest - total_previous
         changes.append({
             "code": code,
             "name": display_name,
@@ -507,9 +776,10 @@ def _build_etf_discord_message(date_str: str | None, etf_names: list[str]) -> st
     selected_etfs = payload.get("selected_etfs", [])
     latest_date = payload.get("latest_date") or (date_str or "")
     items = payload.get("data", [])
-    increase_count = sum(1 for item in items if int(item.get("delta", 0)) > 0)
-    flat_count = sum(1 for item in items if int(item.get("delta", 0)) == 0)
-    decrease_count = sum(1 for item in items if int(item.get("delta", 0)) < 0)
+    # delta 由 fetch_etf_holding_changes 以 holding_count_num 算好，已是整數
+    increase_count = sum(1 for item in items if item["delta"] > 0)
+    flat_count = sum(1 for item in items if item["delta"] == 0)
+    decrease_count = sum(1 for item in items if item["delta"] < 0)
 
     lines = [
         f"ETF掃描 {latest_date}",
@@ -526,7 +796,7 @@ def _build_etf_discord_message(date_str: str | None, etf_names: list[str]) -> st
     for index, item in enumerate(items, start=1):
         code = str(item.get("code", "")).strip()
         name = str(item.get("name", "")).strip()
-        delta = int(item.get("delta", 0))
+        delta = item["delta"]
         sign = "+" if delta > 0 else ""
         lines.append(f"{index}. {code} {name} / {sign}{_format_count(delta)}{_format_price_up_suffix(code)}")
 
@@ -538,7 +808,7 @@ def send_discord_message(message: str, webhook_url: str | None = None) -> None:
     if not target_url:
         raise ValueError("Missing Discord webhook URL")
 
-    response = requests.post(target_url, json={"content": message}, timeout=20)
+    response = requests.post(target_url, json={"content": message}, timeout=DISCORD_TIMEOUT_SECONDS)
     response.raise_for_status()
 
 
@@ -580,23 +850,236 @@ def fetch_etf_common_holdings() -> dict:
     return {"data": data, "time": latest_time}
 
 
+class ResponseCache:
+    """Serialized GET responses keyed by endpoint and query.
+
+    An entry is served only while it is younger than its TTL and the source
+    documents' `time` values still match the version it was built from, so a
+    new snapshot from the monitors invalidates it on the next request.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[tuple[str, str], tuple[tuple, bytes, float]] = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: tuple[str, str], version: tuple) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                cached_version, body, expires_at = entry
+                if cached_version == version and time.monotonic() < expires_at:
+                    self.hits += 1
+                    return body
+                self._entries.pop(key, None)
+                self.invalidations += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple[str, str], version: tuple, body: bytes, ttl_seconds: float) -> None:
+        with self._lock:
+            self._entries[key] = (version, body, time.monotonic() + ttl_seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+response_cache = ResponseCache()
+
+ETF_LATEST_SOURCES = [(ETF_DB_NAME, collection_name) for collection_name, _ in ETF_COLLECTIONS]
+
+# /api/mxf?all=1 與 /api/etf_holding_changes 的版本另外計算（見 mxf_series_version / etf_holding_changes_version）
+MXF_SERIES_TTL_SECONDS = 60
+ETF_HOLDING_CHANGES_TTL_SECONDS = 600
+
+# path -> (fetcher, `_id: "latest"` source documents, TTL seconds)
+CACHED_GET_ENDPOINTS = {
+    "/api/etf_holdings_counts": (fetch_etf_holdings_counts, ETF_LATEST_SOURCES, 600),
+    "/api/etf_common_holdings": (fetch_etf_common_holdings, ETF_LATEST_SOURCES, 600),
+    "/api/etf_common_holdings_tech": (fetch_etf_common_holdings_tech, [(ETF_DB_NAME, ETF_COMMON_TECH_COLLECTION)], 300),
+    "/api/future_index_tech": (fetch_future_index_tech, [(FUTURE_INDEX_DB_NAME, FUTURE_INDEX_COLLECTION)], 300),
+}
+
+
+def _get_latest_source_version(sources: list[tuple[str, str]]) -> tuple:
+    """Return the `time` of each source's latest doc, fetching only that field."""
+    version = []
+    for db_name, collection_name in sources:
+        doc = mongo_client[db_name][collection_name].find_one({"_id": "latest"}, {"time": 1})
+        version.append(doc.get("time") if doc else None)
+    return tuple(version)
+
+
+# One hub polls each topic for every `/api/stream` client.
+snapshot_hub = SnapshotHub({
+    "mxf": lambda: fetch_latest_mxf(None),
+    "stkfut": lambda: fetch_latest_payload(None),
+})
+
+
+def _encode_json(payload: dict) -> bytes:
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+COMPRESS_MIN_BYTES = 1024
+COMPRESSED_BODY_CACHE_SIZE = 64
+_compressed_bodies: "OrderedDict[tuple[str, str], bytes]" = OrderedDict()
+_compressed_bodies_lock = Lock()
+
+
+def _make_etag(*parts: object) -> str:
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def _encoded_etag(etag: str, encoding: str | None) -> str:
+    """Strong ETag of one content-coding: `"<hash>-gzip"`, `"<hash>-deflate"` or the base tag."""
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+
+def _base_etag(tag: str) -> str:
+    """Undo `_encoded_etag` (and a weak `W/` prefix) so any variant matches its base tag."""
+    tag = tag.strip().removeprefix("W/")
+    for encoding in ("gzip", "deflate"):
+        suffix = f'-{encoding}"'
+        if tag.endswith(suffix):
+            return tag[: -len(suffix)] + '"'
+    return tag
+
+
+def _choose_encoding(accept_encoding: str) -> str | None:
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ("gzip", "deflate"):
+        if accepted.get(encoding, 0) > 0:
+            return encoding
+    return None
+
+
+def _compress_body(body: bytes, encoding: str, etag: str) -> bytes:
+    """Compress `body`, remembering recent results by ETag so repeated polls skip the work."""
+    key = (etag, encoding)
+    with _compressed_bodies_lock:
+        cached = _compressed_bodies.get(key)
+        if cached is not None:
+            _compressed_bodies.move_to_end(key)
+            return cached
+    if encoding == "gzip":
+        compressed = gzip.compress(body, compresslevel=6, mtime=0)
+    else:
+        compressed = zlib.compress(body, 6)
+    with _compressed_bodies_lock:
+        _compressed_bodies[key] = compressed
+        while len(_compressed_bodies) > COMPRESSED_BODY_CACHE_SIZE:
+            _compressed_bodies.popitem(last=False)
+    return compressed
+
+
 class MarketApiHandler(BaseHTTPRequestHandler):
     def _send_json(self, status: int, payload: dict) -> None:
-        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self._send_json_body(status, _encode_json(payload))
+
+    def _etag_matches(self, etag: str) -> str | None:
+        """The If-None-Match tag that matches base `etag` in any encoding, echoed back on 304."""
+        for item in self.headers.get("If-None-Match", "").split(","):
+            candidate = item.strip()
+            if candidate == "*":
+                return etag
+            if candidate and _base_etag(candidate) == etag:
+                return candidate
+        return None
+
+    def _send_not_modified(self, etag: str) -> None:
+        self.send_response(304)
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Expose-Headers", "ETag")
+        self.end_headers()
+
+    def _send_versioned(self, cache_key: tuple[str, str], version: tuple, fetcher, ttl_seconds: float) -> None:
+        """Answer from the source `version` alone when possible: 304 first, then the cached body."""
+        etag = _make_etag(cache_key, version)
+        matched = self._etag_matches(etag)
+        if matched:
+            self._send_not_modified(matched)
+            return
+        body = response_cache.get(cache_key, version)
+        if body is None:
+            body = _encode_json(fetcher())
+            response_cache.put(cache_key, version, body, ttl_seconds)
+        self._send_json_body(200, body, etag)
+
+    def _send_json_body(self, status: int, body: bytes, etag: str | None = None) -> None:
+        encoding = None
+        if status == 200:
+            etag = etag or f'"{hashlib.sha1(body).hexdigest()}"'
+            matched = self._etag_matches(etag)
+            if matched:
+                self._send_not_modified(matched)
+                return
+            if len(body) >= COMPRESS_MIN_BYTES:
+                encoding = _choose_encoding(self.headers.get("Accept-Encoding", ""))
+            if encoding:
+                body = _compress_body(body, encoding, etag)
+            # 不同 Content-Encoding 的 body 位元組不同，強 ETag 必須跟著區分
+            etag = _encoded_etag(etag, encoding)
+
         self.send_response(status)
         self.send_header("Content-Type", "application/json; charset=utf-8")
         self.send_header("Content-Length", str(len(body)))
+        if status == 200:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Vary", "Accept-Encoding")
+            self.send_header("Access-Control-Expose-Headers", "ETag")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
         self.send_header("Access-Control-Allow-Headers", "Content-Type")
         self.end_headers()
         self.wfile.write(body)
 
+    def _start_event_stream(self, topics: set[str]) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("X-Accel-Buffering", "no")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(b"retry: 5000\n\n")
+        self.wfile.flush()
+        # The hub owns the socket from here on; this worker thread returns to the pool.
+        self.server.detach_request(self.connection)
+        self.close_connection = True
+        if not snapshot_hub.subscribe(self.connection, topics):
+            self.server.release_request(self.connection)
+
     def do_OPTIONS(self) -> None:
         self.send_response(204)
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
-        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type, If-None-Match")
         self.end_headers()
 
     def do_POST(self) -> None:
@@ -648,7 +1131,8 @@ class MarketApiHandler(BaseHTTPRequestHandler):
 
                     Please provide a concise and professional analysis in Traditional Chinese (Taiwan).
                     """
-                response = openai_client.chat.completions.create(
+                response = run_upstream(
+                    openai_client.chat.completions.create,
                     model="gpt-4o",
                     messages=[
                         {"role": "system", "content": "You are a helpful financial assistant."},
@@ -658,6 +1142,10 @@ class MarketApiHandler(BaseHTTPRequestHandler):
                 
                 answer = response.choices[0].message.content
                 self._send_json(200, {"answer": answer})
+            except UpstreamBusyError as exc:
+                self._send_json(503, {"error": str(exc)})
+            except TimeoutError as exc:
+                self._send_json(504, {"error": str(exc)})
             except Exception as e:
                 print(f"Error in chat_llm: {e}")
                 self._send_json(500, {"error": str(e)})
@@ -681,8 +1169,12 @@ class MarketApiHandler(BaseHTTPRequestHandler):
                     etfs = []
 
                 message = _annotate_price_up_in_message(custom_message) if custom_message else _build_etf_discord_message(date_str, etfs)
-                send_discord_message(message, webhook_url)
+                run_upstream(send_discord_message, message, webhook_url)
                 self._send_json(200, {"status": "ok", "message": message})
+            except UpstreamBusyError as exc:
+                self._send_json(503, {"error": str(exc)})
+            except TimeoutError as exc:
+                self._send_json(504, {"error": str(exc)})
             except Exception as exc:
                 self._send_json(500, {"error": str(exc)})
             return
@@ -694,53 +1186,161 @@ class MarketApiHandler(BaseHTTPRequestHandler):
         query = parse_qs(parsed.query)
         date_str = query.get("date", [None])[0]
         try:
+            if parsed.path == "/api/health":
+                mongo_ok = ping_mongo(MONGO_URI)
+                self._send_json(
+                    200 if mongo_ok else 503,
+                    {
+                        "mongo": mongo_ok,
+                        "mongo_pool": get_mongo_pool_stats(),
+                        "response_cache": response_cache.stats(),
+                        "stream": snapshot_hub.stats(),
+                    },
+                )
+                return
+            if parsed.path == "/api/stream":
+                raw_topics = query.get("topics", [",".join(snapshot_hub.topics)])[0]
+                topics = {item.strip() for item in raw_topics.split(",") if item.strip()}
+                if not topics or not topics <= set(snapshot_hub.topics):
+                    self._send_json(400, {"error": f"Unknown topics: {raw_topics}"})
+                    return
+                if not snapshot_hub.has_capacity():
+                    self._send_json(503, {"error": "Too many stream subscribers"})
+                    return
+                self._start_event_stream(topics)
+                return
+            cache_key = (parsed.path, "&".join(sorted(parsed.query.split("&"))))
+            if parsed.path in CACHED_GET_ENDPOINTS:
+                fetcher, sources, ttl_seconds = CACHED_GET_ENDPOINTS[parsed.path]
+                self._send_versioned(cache_key, _get_latest_source_version(sources), fetcher, ttl_seconds)
+                return
             if parsed.path == "/api/stkfut_tradeinfo":
-                payload = fetch_latest_payload(date_str)
+                payload = fetch_latest_payload(
+                    date_str, query.get("start", [None])[0], query.get("end", [None])[0]
+                )
                 self._send_json(200, payload)
                 return
             if parsed.path == "/api/mxf":
                 if query.get("all", ["0"])[0] == "1":
-                    payload = fetch_mxf_series(date_str)
+                    since = query.get("since", [None])[0]
+                    start = query.get("start", [None])[0]
+                    end = query.get("end", [None])[0]
+                    self._send_versioned(
+                        cache_key,
+                        mxf_series_version(date_str, start, end),
+                        lambda: fetch_mxf_series(date_str, since, start, end),
+                        MXF_SERIES_TTL_SECONDS,
+                    )
                 else:
-                    payload = fetch_latest_mxf(date_str)
-                self._send_json(200, payload)
-                return
-            if parsed.path == "/api/etf_holdings_counts":
-                payload = fetch_etf_holdings_counts()
-                self._send_json(200, payload)
-                return
-            if parsed.path == "/api/etf_common_holdings":
-                payload = fetch_etf_common_holdings()
-                self._send_json(200, payload)
-                return
-            if parsed.path == "/api/etf_common_holdings_tech":
-                payload = fetch_etf_common_holdings_tech()
-                self._send_json(200, payload)
-                return
-            if parsed.path == "/api/future_index_tech":
-                payload = fetch_future_index_tech()
-                self._send_json(200, payload)
+                    self._send_json(200, fetch_latest_mxf(date_str))
                 return
             if parsed.path == "/api/etf_holding_changes":
                 etfs = query.get("etfs", [""])[0].split(",")
-                payload = fetch_etf_holding_changes(date_str, etfs)
-                self._send_json(200, payload)
-                return
-            if parsed.path == "/api/etf_common_holdings":
-                payload = fetch_etf_common_holdings()
-                self._send_json(200, payload)
+                self._send_versioned(
+                    cache_key,
+                    etf_holding_changes_version(date_str, etfs),
+                    lambda: fetch_etf_holding_changes(date_str, etfs),
+                    ETF_HOLDING_CHANGES_TTL_SECONDS,
+                )
                 return
             self._send_json(404, {"error": "Not found"})
         except Exception as exc:
             self._send_json(500, {"error": str(exc)})
 
 
+class PooledHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server that handles requests on a bounded worker pool.
+
+    Long-lived SSE sockets are detached from their worker once the headers are
+    sent, so streaming clients do not hold pool threads. At most `queue_size`
+    connections wait for a free worker; further ones get an immediate 503.
+    """
+
+    request_queue_size = 128
+    _REJECT_RESPONSE = (
+        b"HTTP/1.1 503 Service Unavailable\r\n"
+        b"Content-Type: application/json; charset=utf-8\r\n"
+        b"Content-Length: 28\r\n"
+        b"Retry-After: 1\r\n"
+        b"Access-Control-Allow-Origin: *\r\n"
+        b"Connection: close\r\n\r\n"
+        b'{"error": "Server is busy"}\n'
+    )
+
+    def __init__(self, server_address, handler_class, max_workers: int, queue_size: int = MARKET_API_QUEUE_SIZE) -> None:
+        super().__init__(server_address, handler_class)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="market-api")
+        self.max_pending = max_workers + max(0, queue_size)
+        self._pending = 0
+        self._pending_lock = Lock()
+        self.rejected = 0
+        self._detached: set = set()
+        self._detached_lock = Lock()
+
+    def process_request(self, request, client_address) -> None:
+        with self._pending_lock:
+            accepted = self._pending < self.max_pending
+            if accepted:
+                self._pending += 1
+            else:
+                self.rejected += 1
+        if not accepted:
+            self._reject_request(request)
+            return
+        self.executor.submit(self._process_and_release, request, client_address)
+
+    def _process_and_release(self, request, client_address) -> None:
+        try:
+            self.process_request_thread(request, client_address)
+        finally:
+            with self._pending_lock:
+                self._pending -= 1
+
+    def _reject_request(self, request) -> None:
+        try:
+            # 先讀掉已送達的 request，避免關閉時未讀資料讓對方收到 RST 而看不到 503
+            request.setblocking(False)
+            try:
+                request.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                pass
+            request.settimeout(1)
+            request.sendall(self._REJECT_RESPONSE)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def detach_request(self, request) -> None:
+        with self._detached_lock:
+            self._detached.add(request)
+
+    def release_request(self, request) -> None:
+        with self._detached_lock:
+            self._detached.discard(request)
+
+    def shutdown_request(self, request) -> None:
+        with self._detached_lock:
+            if request in self._detached:
+                self._detached.discard(request)
+                return
+        super().shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
 def main() -> None:
     host = os.getenv("MARKET_API_HOST", "0.0.0.0")
     port = int(os.getenv("PORT", os.getenv("MARKET_API_PORT", "5050")))
-    server = HTTPServer((host, port), MarketApiHandler)
-    print(f"Market API listening on http://{host}:{port}")
-    server.serve_forever()
+    prepare_date_collections()
+    prepare_changes_index()
+    server = PooledHTTPServer((host, port), MarketApiHandler, MARKET_API_WORKERS)
+    print(f"Market API listening on http://{host}:{port} ({MARKET_API_WORKERS} workers)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
 
 
 if __name__ == "__main__":
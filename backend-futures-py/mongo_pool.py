@@ -0,0 +1,139 @@
+"""Process-wide MongoDB client shared by monitors, writers and the market API.
+
+`MongoClient` is itself a thread-safe connection pool, so each process keeps a
+single lazily created client per URI instead of paying a TCP/TLS handshake and
+server discovery on every write. Pool sizes and timeouts come from the MONGO_*
+env vars, read when the client is created.
+"""
+
+from __future__ import annotations
+
+import os
+from threading import Lock
+
+from pymongo import MongoClient
+from pymongo.monitoring import ConnectionPoolListener
+
+# env 變數 -> (MongoClient 參數, 預設值)
+_POOL_SETTINGS = {
+    "MONGO_MAX_POOL_SIZE": ("maxPoolSize", "20"),
+    "MONGO_MIN_POOL_SIZE": ("minPoolSize", "0"),
+    "MONGO_MAX_IDLE_TIME_MS": ("maxIdleTimeMS", "300000"),
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": ("serverSelectionTimeoutMS", "10000"),
+    "MONGO_CONNECT_TIMEOUT_MS": ("connectTimeoutMS", "10000"),
+    "MONGO_SOCKET_TIMEOUT_MS": ("socketTimeoutMS", "30000"),
+}
+
+
+def _pool_options() -> dict:
+    """MongoClient pool/timeout options from the MONGO_* env vars.
+
+    Read when a client is created because callers load .env after importing this module.
+    """
+    return {option: int(os.getenv(name, default)) for name, (option, default) in _POOL_SETTINGS.items()}
+
+
+class _PoolStats(ConnectionPoolListener):
+    """Count client requests against real connection handshakes."""
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.client_requests = 0
+        self.clients_created = 0
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.checkouts = 0
+
+    def _bump(self, name: str) -> None:
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        self._bump("connections_created")
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        self._bump("connections_closed")
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_check_out_failed(self, event) -> None:
+        pass
+
+    def connection_checked_out(self, event) -> None:
+        self._bump("checkouts")
+
+    def connection_checked_in(self, event) -> None:
+        pass
+
+
+_STATS = _PoolStats()
+_CLIENTS: dict[tuple[int, str], MongoClient] = {}
+_CLIENTS_LOCK = Lock()
+
+
+def get_mongo_client(uri: str) -> MongoClient:
+    """Return the shared client for `uri`, creating it on first use.
+
+    Clients are keyed by PID as well, so a forked child never reuses the
+    parent's sockets.
+    """
+    key = (os.getpid(), uri)
+    with _CLIENTS_LOCK:
+        _STATS._bump("client_requests")
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = MongoClient(
+                uri,
+                **_pool_options(),
+                event_listeners=[_STATS],
+            )
+            _CLIENTS[key] = client
+            _STATS._bump("clients_created")
+        return client
+
+
+def ping_mongo(uri: str) -> bool:
+    """Health check: True when the shared client can reach the server."""
+    try:
+        get_mongo_client(uri).admin.command("ping")
+        return True
+    except Exception as exc:
+        print(f"⚠️ MongoDB ping 失敗: {exc}")
+        return False
+
+
+def get_mongo_pool_stats() -> dict:
+    """Snapshot of pool counters: `get_mongo_client` calls next to the connections
+    (ConnectionCreatedEvent) the pools actually opened."""
+    with _STATS.lock:
+        return {
+            "client_requests": _STATS.client_requests,
+            "clients_created": _STATS.clients_created,
+            "connections_created": _STATS.connections_created,
+            "connections_closed": _STATS.connections_closed,
+            "checkouts": _STATS.checkouts,
+        }
+
+
+def close_mongo_clients() -> None:
+    """Close every client owned by this process."""
+    pid = os.getpid()
+    with _CLIENTS_LOCK:
+        for key in [key for key in _CLIENTS if key[0] == pid]:
+            _CLIENTS.pop(key).close()
@@ -1,11 +1,15 @@
 import os
 import csv
+from collections import deque
 from pathlib import Path
 import requests
 import time
 from datetime import datetime, time as dt_time
 from zoneinfo import ZoneInfo
-from pymongo import MongoClient
+from date_collections import ensure_time_index
+from market_series import MXF_SOURCE, insert_series, writes_daily, writes_series
+from mongo_pool import get_mongo_client
+from strategy_common import read_last_n_rows
 
 WEBHOOK_URL = "https://discord.com/api/webhooks/1379030995348488212/4wjckp5NQhvB2v-YJ5RzUASN_H96RqOm2fzmuz9H26px6cLGcnNHfcBBLq7AKfychT5w"
 LAST_ALERT_STATE: str | None = None
@@ -13,6 +17,8 @@ LAST_ALIVE_SENT_SLOT: tuple[str, int] | None = None
 H_TRADE_CSV_PATH = Path(__file__).resolve().parent / "tv_doc" / "h_trade.csv"
 WEBHOOK_DATA_1MIN_PATH = Path(__file__).resolve().parent / "tv_doc" / "webhook_data_1min.csv"
 MTX_BVAV_AVG_WINDOW = 23
+MTX_BVAV_HISTORY: deque[float] | None = None
+MXF_CSV_HEADER_CHECKED = False
 MXF_CSV_HEADER = ["time", "tx_bvav", "mtx_bvav", "mtx_bvav_avg", "signal", "trend"]
 
 def load_env_file(path: str = ".env") -> None:
@@ -65,7 +71,7 @@ def normalize_documents(payload: object) -> list[dict]:
 
 
 def insert_tradeinfo(payload: object, collection_name: str, now: datetime) -> None:
-    client = MongoClient(MONGO_URI)
+    client = get_mongo_client(MONGO_URI)
     db = client[DB_NAME]
     collection = db[collection_name]
 
@@ -77,6 +83,13 @@ def insert_tradeinfo(payload: object, collection_name: str, now: datetime) -> No
     for doc in docs:
         doc.setdefault("time", timestamp)
 
+    # MARKET_STORAGE_MODE=timeseries/both 時寫入單一 time-series 集合
+    if writes_series():
+        count = insert_series(db, MXF_SOURCE, docs)
+        print(f"✅ 成功插入 {count} 筆資料到 time-series 集合")
+    if not writes_daily():
+        return
+
     if len(docs) == 1:
         collection.insert_one(docs[0])
         fetch_time = now.strftime("%y-%m-%d %H-%M")
@@ -84,6 +97,8 @@ def insert_tradeinfo(payload: object, collection_name: str, now: datetime) -> No
     else:
         collection.insert_many(docs)
         print(f"✅ 成功插入 {len(docs)} 筆資料到集合 {collection_name}")
+    # 每天的新集合第一次寫入後建立 time 索引（同一程序內只建一次）
+    ensure_time_index(collection)
 
 
 def _to_float(value: object) -> float | None:
@@ -121,50 +136,73 @@ def _get_trend(mtx_bvav: float | None, mtx_bvav_avg: float | None) -> str:
     return "none"
 
 
-def _read_mtx_bvav_history() -> list[float]:
+def _read_mtx_bvav_history() -> deque[float]:
+    """Seed the rolling window with the newest mtx_bvav values from the CSV tail."""
+    history: deque[float] = deque(maxlen=MTX_BVAV_AVG_WINDOW - 1)
     if not CSV_PATH.exists():
-        return []
+        return history
+
+    count = MTX_BVAV_AVG_WINDOW
+    while True:
+        rows = read_last_n_rows(str(CSV_PATH), count)
+        values = [value for value in (_to_float(row.get("mtx_bvav")) for row in rows) if value is not None]
+        if len(values) >= history.maxlen or len(rows) < count:
+            history.extend(values)
+            return history
+        count *= 4
+
+
+def _get_mtx_bvav_history() -> deque[float]:
+    global MTX_BVAV_HISTORY
+
+    if MTX_BVAV_HISTORY is None:
+        MTX_BVAV_HISTORY = _read_mtx_bvav_history()
+    return MTX_BVAV_HISTORY
 
-    values: list[float] = []
-    with CSV_PATH.open("r", newline="", encoding="utf-8") as handle:
-        reader = csv.DictReader(handle)
-        for row in reader:
-            value = _to_float(row.get("mtx_bvav"))
-            if value is not None:
-                values.append(value)
-    return values
+
+def _record_mtx_bvav(written_value: str) -> None:
+    """Push the value just written to the CSV into the rolling window."""
+    value = _to_float(written_value)
+    if value is not None:
+        _get_mtx_bvav_history().append(value)
 
 
 def _calculate_mtx_bvav_avg(current_value: float | None) -> float | None:
     if current_value is None:
         return None
 
-    history = _read_mtx_bvav_history()
-    window = history[-(MTX_BVAV_AVG_WINDOW - 1):]
+    # Re-summing the fixed-size window keeps the result identical to a plain
+    # sum() over the same values; a running float total could drift.
+    window = list(_get_mtx_bvav_history())
     window.append(current_value)
-    if not window:
-        return None
     return sum(window) / len(window)
 
 
 def _ensure_mxf_csv_header() -> None:
-    if not CSV_PATH.exists():
+    global MXF_CSV_HEADER_CHECKED
+
+    if MXF_CSV_HEADER_CHECKED or not CSV_PATH.exists():
         return
 
     try:
         with CSV_PATH.open("r", newline="", encoding="utf-8") as handle:
-            reader = csv.reader(handle)
-            rows = list(reader)
+            current_header = next(csv.reader(handle), None)
     except Exception:
         return
 
-    if not rows:
+    if current_header is None:
         return
 
-    current_header = rows[0]
+    MXF_CSV_HEADER_CHECKED = True
     if current_header == MXF_CSV_HEADER:
         return
 
+    try:
+        with CSV_PATH.open("r", newline="", encoding="utf-8") as handle:
+            rows = list(csv.reader(handle))
+    except Exception:
+        return
+
     data_rows = rows[1:]
     normalized_rows: list[list[str]] = []
     for row in data_rows:
@@ -209,16 +247,18 @@ def append_tradeinfo_csv(payload: object, now: datetime) -> None:
     CSV_PATH.parent.mkdir(parents=True, exist_ok=True)
     _ensure_mxf_csv_header()
     timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+    mtx_bvav_text = _format_int(mtx_bvav)
     with CSV_PATH.open("a", newline="", encoding="utf-8") as handle:
         writer = csv.writer(handle)
         writer.writerow([
             timestamp,
             _format_int(tx_bvav),
-            _format_int(mtx_bvav),
+            mtx_bvav_text,
             _format_int(mtx_bvav_avg),
             signal,
             trend,
         ])
+    _record_mtx_bvav(mtx_bvav_text)
 
 
 def send_discord_message(message: str) -> None:
@@ -1,11 +1,20 @@
+import json
 import os
+import queue
+import resource
+import sys
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from decimal import Decimal
+from html.parser import HTMLParser
 from pathlib import Path
+from threading import Event, Lock, Thread
 from zoneinfo import ZoneInfo
 
-from pymongo import MongoClient
+import requests
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -14,6 +23,16 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
+from etf_history import (
+    ETF_CHANGES_COLLECTION,
+    ensure_changes_index,
+    make_history_doc,
+    materialize_holding_changes,
+    rebuild_holding_changes,
+)
+from mongo_pool import get_mongo_client
+from numeric_fields import parse_number, with_holding_numbers
+
 
 DB_NAME = "Investment"
 ETF_TARGETS = [
@@ -23,6 +42,11 @@ ETF_TARGETS = [
     ("00992A", "https://www.pocket.tw/etf/tw/00992A/fundholding/", "etf_00992A"),
 ]
 TZ = ZoneInfo("Asia/Taipei")
+USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/125.0.0.0 Safari/537.36"
+)
 
 
 def load_env_file(path: str = ".env") -> None:
@@ -46,10 +70,60 @@ def require_env(name: str) -> str:
     return value
 
 
+def pocket_etf_workers() -> int:
+    """POCKET_ETF_WORKERS: headless Chrome instances per run_once (closed when the run ends).
+
+    Read on every call because .env is loaded after the module-level code runs.
+    """
+    return max(1, int(os.getenv("POCKET_ETF_WORKERS", "2")))
+
+
+def pocket_etf_fetch_mode() -> str:
+    """POCKET_ETF_FETCH_MODE: "auto" (HTTP first, Chrome when parsing finds nothing), "http" or "selenium"."""
+    return os.getenv("POCKET_ETF_FETCH_MODE", "auto").strip().lower()
+
+
 def _normalize_cell(text: str) -> str:
     return " ".join(text.replace("\xa0", " ").split())
 
 
+def _format_holding_count(text: str) -> str:
+    number = parse_number(text)
+    if number is None or number != int(number):
+        return text
+    return f"{int(number):,}"
+
+
+def _format_weight(number: Decimal) -> str:
+    text = f"{number:.2f}"
+    if Decimal(text) != number:
+        text = format(number.normalize(), "f")
+    return f"{text}%"
+
+
+def _canonical_holding(code: str, name: str, holding_count: object, weight: object, weight_scale: int = 1) -> dict:
+    """One holdings row with shares as "1,234,000" and weight as "5.32%", whichever path produced it.
+
+    The table and embedded-JSON paths see the same numbers in different text
+    ("1234000" / 0.0532); without this, switching paths in auto mode would
+    show up as changes in the history. Non-numeric text is kept as is.
+    """
+    count_text = _normalize_cell(str(holding_count if holding_count is not None else ""))
+    weight_text = _normalize_cell(str(weight if weight is not None else ""))
+    weight_number = parse_number(weight_text)
+    if weight_number is not None:
+        scaled = Decimal(str(weight_number))
+        if not weight_text.endswith("%"):
+            scaled *= weight_scale
+        weight_text = _format_weight(scaled)
+    return {
+        "code": code,
+        "name": name,
+        "holding_count": _format_holding_count(count_text),
+        "weight": weight_text,
+    }
+
+
 def _find_header_index(normalized_cells: list[str], aliases: list[str]) -> int | None:
     for idx, cell in enumerate(normalized_cells):
         if any(alias in cell for alias in aliases):
@@ -57,81 +131,398 @@ def _find_header_index(normalized_cells: list[str], aliases: list[str]) -> int |
     return None
 
 
-def fetch_holdings(url: str) -> list[dict]:
-    driver = None
-    try:
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument(
-            "user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/125.0.0.0 Safari/537.36"
-        )
+# 一次 script 呼叫取出所有表格：每列為 [是否為 td, innerText] 的陣列，選取規則與原本 find_elements 相同
+_TABLE_ROWS_SCRIPT = """
+return Array.from(document.querySelectorAll("table")).map((table) =>
+  Array.from(table.querySelectorAll("tr")).map((row) =>
+    Array.from(row.querySelectorAll("th, td")).map((cell) => [
+      cell.tagName === "TD" ? 1 : 0,
+      cell.innerText || "",
+    ])
+  )
+);
+"""
+
+
+def _parse_holdings_tables(tables: list[list[list[list]]]) -> list[dict]:
+    """Pick the first table with a code/name header and return its holdings rows."""
+    holdings: list[dict] = []
+    for rows in tables:
+        if not rows:
+            continue
 
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        driver.get(url)
+        header_index = None
+        code_idx = None
+        name_idx = None
+        holding_count_idx = None
+        weight_idx = None
+        for idx, row in enumerate(rows):
+            normalized = [_normalize_cell(text) for _, text in row]
+            if code_idx is None:
+                code_idx = _find_header_index(normalized, ["代號", "代碼"])
+            if name_idx is None:
+                name_idx = _find_header_index(normalized, ["名稱"])
+            if holding_count_idx is None:
+                holding_count_idx = _find_header_index(normalized, ["持有數", "持有股數", "持有張數", "持有量"])
+            if weight_idx is None:
+                weight_idx = _find_header_index(normalized, ["權重", "比重"])
+            if code_idx is not None and name_idx is not None:
+                header_index = idx
+                break
 
-        WebDriverWait(driver, 30).until(
-            EC.presence_of_all_elements_located((By.CSS_SELECTOR, "table"))
-        )
+        if header_index is None:
+            continue
 
-        holdings: list[dict] = []
-        tables = driver.find_elements(By.TAG_NAME, "table")
-        for table in tables:
-            rows = table.find_elements(By.CSS_SELECTOR, "tr")
-            if not rows:
+        required_idx = max(
+            idx for idx in [code_idx, name_idx, holding_count_idx, weight_idx] if idx is not None
+        )
+        for row in rows[header_index + 1 :]:
+            cells = [text for is_td, text in row if is_td]
+            if len(cells) <= required_idx:
                 continue
-
-            header_index = None
-            code_idx = None
-            name_idx = None
-            holding_count_idx = None
-            weight_idx = None
-            for idx, row in enumerate(rows):
-                cells = row.find_elements(By.CSS_SELECTOR, "th, td")
-                normalized = [_normalize_cell(cell.text) for cell in cells]
-                if code_idx is None:
-                    code_idx = _find_header_index(normalized, ["代號", "代碼"])
-                if name_idx is None:
-                    name_idx = _find_header_index(normalized, ["名稱"])
-                if holding_count_idx is None:
-                    holding_count_idx = _find_header_index(normalized, ["持有數", "持有股數", "持有張數", "持有量"])
-                if weight_idx is None:
-                    weight_idx = _find_header_index(normalized, ["權重", "比重"])
-                if code_idx is not None and name_idx is not None:
-                    header_index = idx
-                    break
-
-            if header_index is None:
+            code = _normalize_cell(cells[code_idx])
+            name = _normalize_cell(cells[name_idx])
+            if not code or not name:
+                continue
+            if "代號" in code or "名稱" in name:
                 continue
+            holding_count = cells[holding_count_idx] if holding_count_idx is not None and len(cells) > holding_count_idx else ""
+            weight = cells[weight_idx] if weight_idx is not None and len(cells) > weight_idx else ""
+            holdings.append(_canonical_holding(code, name, holding_count, weight))
 
-            required_idx = max(
-                idx for idx in [code_idx, name_idx, holding_count_idx, weight_idx] if idx is not None
-            )
-            for row in rows[header_index + 1 :]:
-                cells = row.find_elements(By.CSS_SELECTOR, "td")
-                if len(cells) <= required_idx:
-                    continue
-                code = _normalize_cell(cells[code_idx].text)
-                name = _normalize_cell(cells[name_idx].text)
+        if holdings:
+            break
+    return holdings
+
+
+_chromedriver_path: str | None = None
+_chromedriver_lock = Lock()
+
+
+def _get_chromedriver_path() -> str:
+    """Resolve chromedriver once per process instead of once per ETF."""
+    global _chromedriver_path
+    with _chromedriver_lock:
+        if _chromedriver_path is None:
+            _chromedriver_path = ChromeDriverManager().install()
+        return _chromedriver_path
+
+
+def _start_driver() -> webdriver.Chrome:
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument(f"user-agent={USER_AGENT}")
+    service = Service(_get_chromedriver_path())
+    return webdriver.Chrome(service=service, options=chrome_options)
+
+
+def _quit_driver(driver: webdriver.Chrome) -> None:
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+class DriverPool:
+    """Up to `size` headless Chrome instances reused across the ETFs of one run."""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._idle: "queue.Queue[webdriver.Chrome]" = queue.Queue()
+        self._drivers: list[webdriver.Chrome] = []
+        self._starting = 0
+        self._lock = Lock()
+
+    def acquire(self) -> webdriver.Chrome:
+        with self._lock:
+            start_new = self._idle.empty() and self._starting + len(self._drivers) < self.size
+            if start_new:
+                self._starting += 1
+        if not start_new:
+            return self._idle.get()
+        # 在鎖外啟動，讓多個瀏覽器可以同時冷啟動
+        try:
+            driver = _start_driver()
+        finally:
+            with self._lock:
+                self._starting -= 1
+        with self._lock:
+            self._drivers.append(driver)
+        return driver
+
+    def release(self, driver: webdriver.Chrome) -> None:
+        self._idle.put(driver)
+
+    def discard(self, driver: webdriver.Chrome) -> None:
+        """Drop a driver that may be broken; the next acquire starts a fresh one."""
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+        _quit_driver(driver)
+
+    def close(self) -> None:
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            _quit_driver(driver)
+
+
+def _process_tree_rss_kb(root_pid: int) -> int:
+    """RSS of `root_pid` and all its descendants (Chrome runs as grandchildren), Linux only."""
+    children: dict[int, list[int]] = {}
+    rss: dict[int, int] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/status", "r", encoding="utf-8") as handle:
+                fields = dict(line.split(":", 1) for line in handle if ":" in line)
+        except OSError:
+            continue
+        pid = int(entry)
+        children.setdefault(int(fields.get("PPid", "0").strip() or 0), []).append(pid)
+        rss[pid] = int(fields.get("VmRSS", "0 kB").split()[0])
+    total, stack = 0, [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total
+
+
+class PeakRssSampler:
+    """Sample this process tree's RSS in the background and keep the peak (KB)."""
+
+    def __init__(self, interval: float = 0.5) -> None:
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = Event()
+        self._thread = Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, _process_tree_rss_kb(os.getpid()))
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "PeakRssSampler":
+        if sys.platform.startswith("linux"):
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        else:
+            # 非 Linux 只能取得本程序（不含 Chrome）的峰值；macOS 單位為 bytes
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.peak_kb = maxrss // 1024 if sys.platform == "darwin" else maxrss
+
+
+class _TableCollector(HTMLParser):
+    """Collect <table> rows from static HTML in the same shape as _TABLE_ROWS_SCRIPT.
+
+    Rows also belong to every enclosing table, matching querySelectorAll on
+    nested tables. Unclosed <tr>/<td> are closed implicitly as a browser would,
+    `<script>` / `<style>` text is skipped and `<br>` becomes a space.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.tables: list[list[list[list]]] = []
+        self.json_scripts: list[str] = []
+        self._open_tables: list[list] = []
+        # (table depth, row) / (table depth, cell) of elements not yet closed
+        self._open_rows: list[tuple[int, list]] = []
+        self._open_cells: list[tuple[int, list]] = []
+        self._skip_depth = 0
+        self._json_script: list[str] | None = None
+
+    def _close_cells(self, depth: int) -> None:
+        while self._open_cells and self._open_cells[-1][0] >= depth:
+            _, cell = self._open_cells.pop()
+            cell[1] = "".join(cell[1])
+
+    def _close_rows(self, depth: int) -> None:
+        self._close_cells(depth)
+        while self._open_rows and self._open_rows[-1][0] >= depth:
+            self._open_rows.pop()
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        depth = len(self._open_tables)
+        if tag == "table":
+            table: list = []
+            self.tables.append(table)
+            self._open_tables.append(table)
+        elif tag == "tr" and depth:
+            self._close_rows(depth)
+            row: list = []
+            for table in self._open_tables:
+                table.append(row)
+            self._open_rows.append((depth, row))
+        elif tag in ("td", "th") and self._open_rows and self._open_rows[-1][0] == depth:
+            self._close_cells(depth)
+            cell = [1 if tag == "td" else 0, []]
+            self._open_rows[-1][1].append(cell)
+            self._open_cells.append((depth, cell))
+        elif tag == "br":
+            self.handle_data(" ")
+        elif tag in ("script", "style"):
+            attributes = dict(attrs)
+            if tag == "script" and (
+                "json" in (attributes.get("type") or "") or attributes.get("id") == "__NEXT_DATA__"
+            ):
+                self._json_script = []
+            else:
+                self._skip_depth += 1
+
+    def handle_endtag(self, tag: str) -> None:
+        depth = len(self._open_tables)
+        if tag == "table" and depth:
+            self._close_rows(depth)
+            self._open_tables.pop()
+        elif tag == "tr":
+            self._close_rows(depth)
+        elif tag in ("td", "th"):
+            self._close_cells(depth)
+        elif tag in ("script", "style"):
+            if self._json_script is not None:
+                self.json_scripts.append("".join(self._json_script))
+                self._json_script = None
+            elif self._skip_depth:
+                self._skip_depth -= 1
+
+    def handle_data(self, data: str) -> None:
+        if self._json_script is not None:
+            self._json_script.append(data)
+        elif not self._skip_depth:
+            for _, cell in self._open_cells:
+                cell[1].append(data)
+
+    def close(self) -> None:
+        super().close()
+        self._close_rows(0)
+
+
+_JSON_KEY_ALIASES = {
+    "code": ("code", "stockno", "stock_no", "stockid", "stock_id", "symbol", "代號", "代碼"),
+    "name": ("name", "stockname", "stock_name", "名稱"),
+    "holding_count": ("holding_count", "shares", "share", "quantity", "qty", "持有數", "持有股數"),
+    "weight": ("weight", "ratio", "percent", "percentage", "權重", "比重"),
+}
+
+
+def _holdings_from_json(value) -> list[dict]:
+    """Find the first list of objects carrying code + name + holding_count/weight fields in embedded JSON.
+
+    Requiring a count or weight key keeps other code + name lists in the page
+    state (related ETFs, top movers) from being taken as holdings.
+    """
+    if isinstance(value, dict):
+        candidates = list(value.values())
+    elif isinstance(value, list):
+        keys = {}
+        if value and all(isinstance(item, dict) for item in value):
+            lowered = {key.lower(): key for key in value[0]}
+            for field, aliases in _JSON_KEY_ALIASES.items():
+                keys[field] = next((lowered[alias] for alias in aliases if alias in lowered), None)
+        if keys.get("code") and keys.get("name") and (keys.get("holding_count") or keys.get("weight")):
+            weight_scale = 1
+            if keys["weight"]:
+                # 權重為小數比例（總和約 1，例如 0.0532）時換算成百分比
+                raw_weights = [item.get(keys["weight"]) for item in value]
+                numbers = [weight for weight in raw_weights if isinstance(weight, (int, float)) and not isinstance(weight, bool)]
+                if numbers and len(numbers) == len(raw_weights) and sum(numbers) <= 1.0001:
+                    weight_scale = 100
+            holdings = []
+            for item in value:
+                code = _normalize_cell(str(item.get(keys["code"]) or ""))
+                name = _normalize_cell(str(item.get(keys["name"]) or ""))
                 if not code or not name:
                     continue
-                if "代號" in code or "名稱" in name:
-                    continue
-                holding_count = _normalize_cell(cells[holding_count_idx].text) if holding_count_idx is not None and len(cells) > holding_count_idx else ""
-                weight = _normalize_cell(cells[weight_idx].text) if weight_idx is not None and len(cells) > weight_idx else ""
-                holdings.append({
-                    "code": code,
-                    "name": name,
-                    "holding_count": holding_count,
-                    "weight": weight,
-                })
-
+                holdings.append(_canonical_holding(
+                    code,
+                    name,
+                    item.get(keys["holding_count"], "") if keys["holding_count"] else "",
+                    item.get(keys["weight"], "") if keys["weight"] else "",
+                    weight_scale,
+                ))
             if holdings:
-                break
+                return holdings
+        candidates = value
+    else:
+        return []
+    for candidate in candidates:
+        holdings = _holdings_from_json(candidate)
+        if holdings:
+            return holdings
+    return []
+
+
+def parse_holdings_html(html: str) -> list[dict]:
+    """Holdings from a page's initial HTML: its tables first, then embedded JSON data."""
+    collector = _TableCollector()
+    collector.feed(html)
+    collector.close()
+    holdings = _parse_holdings_tables(collector.tables)
+    if holdings:
+        return holdings
+    for raw in collector.json_scripts:
+        try:
+            holdings = _holdings_from_json(json.loads(raw))
+        except ValueError:
+            continue
+        if holdings:
+            return holdings
+    return []
+
+
+_http_session: requests.Session | None = None
+_http_session_lock = Lock()
+
+
+def _get_http_session() -> requests.Session:
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(pocket_etf_workers(), 4))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "zh-TW,zh;q=0.9"})
+            _http_session = session
+        return _http_session
+
+
+def fetch_holdings_http(url: str) -> list[dict]:
+    """Fetch holdings without a browser; an empty list means the Selenium path is needed."""
+    try:
+        response = _get_http_session().get(url, timeout=20)
+        response.raise_for_status()
+        # 沒有 charset 時 requests 會假設 ISO-8859-1，中文表頭（代號/名稱）就會解碼錯誤
+        if "charset" not in response.headers.get("Content-Type", "").lower():
+            response.encoding = "utf-8"
+        return parse_holdings_html(response.text)
+    except Exception as exc:
+        print(f"⚠️ HTTP 抓取持股明細失敗: {exc}")
+        return []
+
+
+def fetch_holdings(url: str, driver: webdriver.Chrome | None = None) -> list[dict]:
+    """Scrape one ETF holdings table; without `driver` a temporary browser is used."""
+    own_driver = driver is None
+    try:
+        if own_driver:
+            driver = _start_driver()
+        driver.get(url)
+
+        WebDriverWait(driver, 30).until(
+            EC.presence_of_all_elements_located((By.CSS_SELECTOR, "table"))
+        )
+
+        holdings = _parse_holdings_tables(driver.execute_script(_TABLE_ROWS_SCRIPT) or [])
 
         if not holdings:
             print("⚠️ 未找到持股明細，請確認網站結構是否變動。")
@@ -140,8 +531,8 @@ def fetch_holdings(url: str) -> list[dict]:
         print(f"❌ 抓取持股明細失敗: {exc}")
         return []
     finally:
-        if driver is not None:
-            driver.quit()
+        if own_driver and driver is not None:
+            _quit_driver(driver)
 
 
 def upsert_holdings(collection_name: str, source_url: str, data: list[dict], now: datetime) -> None:
@@ -150,16 +541,13 @@ def upsert_holdings(collection_name: str, source_url: str, data: list[dict], now
         return
 
     mongo_uri = require_env("MONGO_URI")
-    client = MongoClient(mongo_uri)
+    client = get_mongo_client(mongo_uri)
     db = client[DB_NAME]
     collection = db[collection_name]
 
     timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
-    payload = {
-        "time": timestamp,
-        "source": source_url,
-        "data": data,
-    }
+    # 持有數與權重另存數字欄位（holding_count_num / weight_num），讀取端不必再解析字串
+    data = [with_holding_numbers(row) for row in data]
 
     # 保留最新資料給現有 API 使用
     latest_payload = {
@@ -170,21 +558,66 @@ def upsert_holdings(collection_name: str, source_url: str, data: list[dict], now
     }
     collection.replace_one({"_id": "latest"}, latest_payload, upsert=True)
 
-    # 每次執行都新增一筆歷史資料，不覆蓋舊紀錄
-    history_payload = {
-        "_id": f"{timestamp}-{uuid.uuid4().hex}",
-        **payload,
-    }
+    # 每次執行都新增一筆歷史資料，不覆蓋舊紀錄；平常只存相對 base 的差異
+    history_payload = make_history_doc(
+        collection, f"{timestamp}-{uuid.uuid4().hex}", timestamp, source_url, data
+    )
     collection.insert_one(history_payload)
-    print(f"✅ 已新增 {collection_name} 持股明細快照，時間 {timestamp} 共 {len(data)} 筆")
+    print(
+        f"✅ 已新增 {collection_name} 持股明細快照（{history_payload['kind']}），"
+        f"時間 {timestamp} 共 {len(data)} 筆"
+    )
+
+    # 同步更新持股增減表，API 與 Discord 直接讀取；第一次執行時補齊歷史日期
+    changes = db[ETF_CHANGES_COLLECTION]
+    ensure_changes_index(changes)
+    if changes.find_one({"etf": collection_name}, {"_id": 1}) is None:
+        count = rebuild_holding_changes(collection, changes)
+        print(f"✅ 已補齊 {collection_name} 持股增減表 {count} 天")
+    else:
+        materialize_holding_changes(collection, changes, timestamp[:10])
 
 
 def run_once() -> None:
     now = datetime.now(TZ)
-    for symbol, url, collection_name in ETF_TARGETS:
+    started = time.perf_counter()
+    workers = min(pocket_etf_workers(), len(ETF_TARGETS))
+    fetch_mode = pocket_etf_fetch_mode()
+    pool = DriverPool(workers)
+
+    def fetch(target: tuple[str, str, str]) -> list[dict]:
+        symbol, url, _ = target
         print(f"📌 下載 {symbol} 持股明細...")
-        holdings = fetch_holdings(url)
+        if fetch_mode in ("auto", "http"):
+            holdings = fetch_holdings_http(url)
+            if holdings or fetch_mode == "http":
+                return holdings
+            print(f"⚠️ {symbol} HTTP 解析不到持股，改用 Chrome")
+        try:
+            driver = pool.acquire()
+        except Exception as exc:
+            print(f"❌ {symbol} 無法啟動 Chrome: {exc}")
+            return []
+        holdings = fetch_holdings(url, driver)
+        if holdings:
+            pool.release(driver)
+        else:
+            pool.discard(driver)
+        return holdings
+
+    with PeakRssSampler() as sampler:
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pocket-etf") as executor:
+                results = list(executor.map(fetch, ETF_TARGETS))
+        finally:
+            pool.close()
+
+    for (symbol, url, collection_name), holdings in zip(ETF_TARGETS, results):
         upsert_holdings(collection_name, url, holdings, now)
+    print(
+        f"⏱️ Pocket ETF 持股明細完成，{len(ETF_TARGETS)} 檔 / 最多 {workers} 個 Chrome，"
+        f"耗時 {time.perf_counter() - started:.1f}s，峰值 RSS {sampler.peak_kb / 1024:.0f} MB"
+    )
 
 
 def next_run_time(now: datetime) -> datetime:
@@ -4,7 +4,10 @@ import requests
 import time
 from datetime import datetime, time as dt_time
 from zoneinfo import ZoneInfo
-from pymongo import MongoClient
+
+from date_collections import ensure_time_index
+from market_series import STKFUT_SOURCE, insert_series, writes_daily, writes_series
+from mongo_pool import get_mongo_client
 
 
 def load_env_file(path: str = ".env") -> None:
@@ -56,7 +59,7 @@ def normalize_documents(payload: object) -> list[dict]:
 
 
 def insert_tradeinfo(payload: object, collection_name: str, now: datetime) -> None:
-    client = MongoClient(MONGO_URI)
+    client = get_mongo_client(MONGO_URI)
     db = client[DB_NAME]
     collection = db[collection_name]
 
@@ -69,6 +72,13 @@ def insert_tradeinfo(payload: object, collection_name: str, now: datetime) -> No
     for doc in docs:
         doc.setdefault("time", timestamp)
 
+    # MARKET_STORAGE_MODE=timeseries/both 時寫入單一 time-series 集合
+    if writes_series():
+        count = insert_series(db, STKFUT_SOURCE, docs)
+        print(f"✅ 成功插入 {count} 筆資料到 time-series 集合")
+    if not writes_daily():
+        return
+
     if len(docs) == 1:
         collection.insert_one(docs[0])
         fetch_time = now.strftime("%y-%m-%d %H-%M")
@@ -76,6 +86,8 @@ def insert_tradeinfo(payload: object, collection_name: str, now: datetime) -> No
     else:
         collection.insert_many(docs)
         print(f"✅ 成功插入 {len(docs)} 筆資料到集合 {collection_name}")
+    # 每天的新集合第一次寫入後建立 time 索引（同一程序內只建一次）
+    ensure_time_index(collection)
 
 
 def get_collection_name(now: datetime) -> str:
@@ -1,10 +1,15 @@
 import os
+import hashlib
 import json
 import time
 import platform
-import re
+import queue
+import shutil
+import tempfile
 from datetime import datetime, timedelta
 from pathlib import Path
+from threading import Lock, Thread, local
+from urllib.parse import parse_qs, urlparse
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
@@ -12,8 +17,13 @@ from selenium.webdriver.chrome.options import Options
 import pandas as pd
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
-from pymongo import MongoClient, UpdateOne
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from pymongo import UpdateOne
+
+from date_collections import DateCollections
+from mongo_pool import get_mongo_client
+from numeric_fields import TURNOVER_NUMERIC_FIELDS, with_numeric_fields, with_tv_numbers
+from tw_stock_index import get_stock_market
 
 
 # service = Service()  # 自動找到 chromedriver
@@ -33,7 +43,8 @@ use_headless = chrome_headless_env.lower() == "true" if chrome_headless_env else
 if not chrome_user_data_dir and platform.system() == "Darwin":
     chrome_user_data_dir = os.path.expanduser("~/Library/Application Support/Google/Chrome")
 
-def _build_options(use_debugger: bool) -> Options:
+
+def _build_options(use_debugger: bool, use_profile: bool = True, user_data_dir: str | None = None) -> Options:
     opts = Options()
     if not use_headless and use_debugger:
         opts.debugger_address = chrome_debugger or "127.0.0.1:9222"
@@ -45,49 +56,185 @@ def _build_options(use_debugger: bool) -> Options:
     opts.add_argument("--disable-gpu")
     opts.add_argument("--window-size=1920,1080")
 
-    if not use_debugger and chrome_user_data_dir:
-        opts.add_argument(f"--user-data-dir={chrome_user_data_dir}")
+    user_data_dir = user_data_dir or chrome_user_data_dir
+    if not use_debugger and use_profile and user_data_dir:
+        opts.add_argument(f"--user-data-dir={user_data_dir}")
         opts.add_argument(f"--profile-directory={chrome_profile}")
     return opts
 
 
+# 複製 profile 時略過快取與 Chrome 的單一執行個體鎖，只保留登入狀態（cookies、local storage 等）
+_PROFILE_COPY_IGNORE = shutil.ignore_patterns(
+    "Singleton*", "lockfile", "*Cache", "Crashpad", "Service Worker", "optimization_guide*"
+)
+
+
+def _copy_worker_profile(number: int) -> str | None:
+    """Copy CHROME_PROFILE of CHROME_USER_DATA_DIR into a temp user-data-dir for one worker.
+
+    Chrome locks a user-data-dir to one process, so parallel workers cannot
+    share it; each gets its own copy to keep the TradingView login.
+    """
+    if not chrome_user_data_dir or not os.path.isdir(os.path.join(chrome_user_data_dir, chrome_profile)):
+        return None
+    copy_dir = tempfile.mkdtemp(prefix=f"tv-worker-{number}-")
+    try:
+        local_state = os.path.join(chrome_user_data_dir, "Local State")
+        if os.path.isfile(local_state):
+            shutil.copy2(local_state, copy_dir)
+        shutil.copytree(
+            os.path.join(chrome_user_data_dir, chrome_profile),
+            os.path.join(copy_dir, chrome_profile),
+            ignore=_PROFILE_COPY_IGNORE,
+        )
+    except shutil.Error as exc:
+        # 使用中的 Chrome 可能鎖住部分檔案；其餘檔案已複製，登入狀態通常仍可用
+        print(f"⚠️ tv-worker-{number} profile 部分檔案無法複製: {len(exc.args[0])} 個")
+    except OSError as exc:
+        print(f"⚠️ tv-worker-{number} 無法複製 Chrome profile，改用未登入的 Chrome: {repr(exc)}")
+        shutil.rmtree(copy_dir, ignore_errors=True)
+        return None
+    return copy_dir
+
+
 options = _build_options(chrome_use_debugger)
 
-driver = None
+# 每個執行緒各自擁有一個 driver：主執行緒沿用原本的長駐 driver，平行 worker 各自開一個 Chrome（使用自己的 profile 複本）
+_driver_local = local()
 
 
-def _get_driver() -> webdriver.Chrome:
-    global driver
-    if driver is not None:
-        return driver
+def _start_driver() -> webdriver.Chrome:
+    worker_options = getattr(_driver_local, "options", None)
+    if worker_options is not None:
+        return webdriver.Chrome(options=worker_options)
     try:
-        driver = webdriver.Chrome(options=options)
+        return webdriver.Chrome(options=options)
     except Exception as exc:
         # 如果預設 debugger(127.0.0.1:9222) 連不上，改成一般啟動再試一次
         if not use_headless and chrome_use_debugger:
             print(f"⚠️ Chrome debugger 啟動失敗，改用一般模式重試: {repr(exc)}")
-            driver = webdriver.Chrome(options=_build_options(False))
-        else:
-            raise
+            return webdriver.Chrome(options=_build_options(False))
+        raise
+
+
+def _get_driver() -> webdriver.Chrome:
+    driver = getattr(_driver_local, "driver", None)
+    if driver is None:
+        driver = _start_driver()
+        _driver_local.driver = driver
+        _driver_local.tabs = {}
+        _driver_local.chart = None
     return driver
 
 
 def _reset_driver() -> webdriver.Chrome:
-    global driver
+    _quit_driver()
+    return _get_driver()
+
+
+def _quit_driver() -> None:
+    driver = getattr(_driver_local, "driver", None)
+    _driver_local.driver = None
+    _driver_local.tabs = {}
+    _driver_local.chart = None
     try:
         if driver is not None:
             driver.quit()
     except Exception:
         pass
-    try:
-        driver = webdriver.Chrome(options=options)
-    except Exception as exc:
-        if not use_headless and chrome_use_debugger:
-            print(f"⚠️ Chrome debugger 重建失敗，改用一般模式重試: {repr(exc)}")
-            driver = webdriver.Chrome(options=_build_options(False))
-        else:
-            raise
-    return driver
+
+
+class _RateLimiter:
+    """Space page loads at least `min_interval` seconds apart across all workers."""
+
+    def __init__(self, min_interval: float) -> None:
+        self.min_interval = min_interval
+        self._next_slot = 0.0
+        self._lock = Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _is_driver_crash(exc: Exception) -> bool:
+    message = str(exc).lower()
+    return "invalid session id" in message or "disconnected" in message or "chrome not reachable" in message
+
+
+def _resolve_worker_count(requested: int | None) -> int:
+    workers = TV_WORKERS if requested is None else max(1, requested)
+    if workers > 1 and not use_headless and chrome_use_debugger:
+        print("⚠️ remote debugger 模式只能共用一個 Chrome，平行 worker 改為 1")
+        return 1
+    return workers
+
+
+def _run_symbol_tasks(tasks: list, handler, workers: int | None = None) -> list:
+    """Run `handler(task)` for every task on a pool of Chrome workers.
+
+    Results keep the order of `tasks`; a handler returning None is dropped.
+    With one worker the tasks run on the calling thread and reuse its driver.
+    """
+    workers = min(_resolve_worker_count(workers), max(len(tasks), 1))
+    limiter = _RateLimiter(TV_MIN_INTERVAL_SECONDS)
+    results: list = [None] * len(tasks)
+
+    def run_task(index: int) -> None:
+        limiter.wait()
+        try:
+            results[index] = handler(tasks[index])
+        except WebDriverException as exc:
+            if not _is_driver_crash(exc):
+                raise
+            print(f"⚠️ Chrome worker 失效，重建後重試: {repr(exc)}")
+            _reset_driver()
+            results[index] = handler(tasks[index])
+
+    if workers == 1:
+        for index in range(len(tasks)):
+            try:
+                run_task(index)
+            except Exception as exc:
+                print(f"⚠️ 第 {index + 1} 筆抓取失敗，略過: {repr(exc)}")
+        return [result for result in results if result is not None]
+
+    pending: "queue.Queue[int]" = queue.Queue()
+    for index in range(len(tasks)):
+        pending.put(index)
+
+    def worker(number: int) -> None:
+        # 平行 worker 不能共用 user-data-dir（Chrome 會鎖住 profile），各自使用一份 profile 複本以保留登入；
+        # 是否 headless 仍依 CHROME_HEADLESS
+        profile_dir = _copy_worker_profile(number)
+        _driver_local.options = _build_options(False, use_profile=profile_dir is not None, user_data_dir=profile_dir)
+        try:
+            while True:
+                try:
+                    index = pending.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    run_task(index)
+                except Exception as exc:
+                    print(f"⚠️ 第 {index + 1} 筆抓取失敗，略過: {repr(exc)}")
+        finally:
+            _quit_driver()
+            if profile_dir:
+                shutil.rmtree(profile_dir, ignore_errors=True)
+
+    threads = [
+        Thread(target=worker, args=(number,), name=f"tv-worker-{number}", daemon=True) for number in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [result for result in results if result is not None]
 
 
 TRADINGVIEW_XPATHS = {
@@ -126,6 +273,46 @@ TRADINGVIEW_ANALYST_RATING_LABELS = [
 ]
 
 
+# 一次 round-trip 讀出所有 XPath 的文字；找不到的節點回傳 null
+_XPATH_TEXTS_SCRIPT = """
+const xpaths = arguments[0];
+const values = {};
+for (const [key, xpath] of Object.entries(xpaths)) {
+  const node = document.evaluate(
+    xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+  ).singleNodeValue;
+  values[key] = node ? (node.innerText || node.textContent || "").trim() : null;
+}
+return values;
+"""
+
+
+def _get_texts_by_xpaths(driver: webdriver.Chrome, xpaths: dict[str, str], timeout: int = 60) -> dict[str, str]:
+    """Wait once until every XPath has text, then return them from a single script call.
+
+    Fields still missing after `timeout` fall back to `_get_text_by_xpath` one by one.
+    """
+    snapshot: dict[str, str | None] = {}
+
+    def all_present(d: webdriver.Chrome) -> bool:
+        snapshot.update(d.execute_script(_XPATH_TEXTS_SCRIPT, xpaths) or {})
+        return all(snapshot.get(key) for key in xpaths)
+
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.25).until(all_present)
+    except TimeoutException:
+        pass
+
+    values = {}
+    for key, xpath in xpaths.items():
+        text = snapshot.get(key)
+        if text:
+            values[key] = text.replace(",", "")
+        else:
+            values[key] = _get_text_by_xpath(driver, xpath)
+    return values
+
+
 def _get_text_by_xpath(driver: webdriver.Chrome, xpath: str, timeout: int = 60) -> str:
     element = WebDriverWait(driver, timeout).until(
         EC.visibility_of_element_located((By.XPATH, xpath))
@@ -150,7 +337,7 @@ def load_json(fp: str):
     with open(fp, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-stock_list = load_json('./static/twStock.json')
+# twStock.json 只用到 market，改由 tw_stock_index 的精簡索引按需查詢
 index_list = load_json('./static/indexAndFuture.json')
 
 
@@ -188,15 +375,30 @@ ETF_COLLECTIONS = [
     "etf_00992A",
 ]
 ETF_COMMON_TECH_COLLECTION = "etf_Initiative_tech"
+# forecast 快取放在獨立的資料庫，不和 WANTGOO_DB_NAME 的日期集合混在一起
+TV_CACHE_DB_NAME = "tv_cache"
+TV_FORECAST_CACHE_COLLECTION = "tv_forecast_cache"
+# 平行抓取的 Chrome worker 數量，以及所有 worker 共用的最短開頁間隔（取代原本每檔固定 sleep 1 秒）
+TV_WORKERS = max(1, int(os.getenv("TV_WORKERS", "1")))
+TV_MIN_INTERVAL_SECONDS = float(os.getenv("TV_MIN_INTERVAL_SECONDS", "1"))
+# 同一個 chart 分頁內直接切換商品，不重新載入整個 layout；切換後等待指標數值變化的上限秒數
+TV_SYMBOL_SWITCH = os.getenv("TV_SYMBOL_SWITCH", "true").lower() == "true"
+TV_SYMBOL_SWITCH_TIMEOUT = float(os.getenv("TV_SYMBOL_SWITCH_TIMEOUT", "20"))
+# 逐檔結果累積到 N 筆或 T 秒就以 bulk_write 寫入
+TV_WRITE_BATCH_SIZE = int(os.getenv("TV_WRITE_BATCH_SIZE", "20"))
+TV_WRITE_FLUSH_SECONDS = float(os.getenv("TV_WRITE_FLUSH_SECONDS", "30"))
+# 分析師目標價與評級一天最多變一次：預設 20 小時內沿用快取，搭配 21:15 與盤中排程約每個交易日抓一次
+TV_FORECAST_MAX_AGE_HOURS = float(os.getenv("TV_FORECAST_MAX_AGE_HOURS", "20"))
+
+
+_turnover_collections: DateCollections | None = None
 
 
 def _get_latest_turnover_collection_name(db) -> str | None:
-    candidates = [
-        name
-        for name in db.list_collection_names()
-        if re.fullmatch(r"\d{4}-\d{2}-\d{2}", name)
-    ]
-    return max(candidates) if candidates else None
+    global _turnover_collections
+    if _turnover_collections is None or _turnover_collections.db.name != db.name:
+        _turnover_collections = DateCollections(db)
+    return _turnover_collections.latest()
 
 
 def _current_timestamp() -> str:
@@ -229,22 +431,126 @@ def _normalize_binary_text(value: str) -> str:
     return f"{numeric:.2f}"
 
 
-def _upsert_yahoo_turnover_items(collection_name: str, items: list[dict]) -> None:
+def _content_hash(payload: dict) -> str:
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
+
+
+# 成交值排行每檔的 TradingView 欄位；抓取失敗時全部清空並標記 tv_status，避免留下上一輪的舊值
+TV_TURNOVER_FIELDS = (
+    "sqzmom_stronger_1d",
+    "heikin_Ashi",
+    "ma5_1d",
+    "ma10_1d",
+    "ma20_1d",
+    "ma50_1d",
+    "ma100_1d",
+    "entry_signal",
+    "add_position_signal",
+    "buyback_signal",
+    "reduce_1_signal",
+    "reduce_2_signal",
+    "clear_position_signal",
+    "has_position_signal",
+    "target_price",
+    "strong_buy_score",
+    "buy_score",
+    "hold_score",
+    "sell_score",
+    "strong_sell_score",
+)
+
+
+def _failed_tv_payload() -> dict:
+    """TV fields of a code whose scrape failed: blank values and `tv_status: "failed"`."""
+    return {**with_tv_numbers({field: "" for field in TV_TURNOVER_FIELDS}), "tv_status": "failed"}
+
+
+class _WantgooBatchWriter:
+    """Buffer per-code `$set` updates for one collection and write them with bulk_write.
+
+    The content hash of each payload is stored in `hash_field`; a code whose
+    payload hashes the same as the stored one is skipped without a write.
+    `time_field` records when that payload last changed.
+    """
+
+    def __init__(
+        self,
+        collection,
+        hash_field: str,
+        time_field: str,
+        batch_size: int = TV_WRITE_BATCH_SIZE,
+        flush_seconds: float = TV_WRITE_FLUSH_SECONDS,
+    ) -> None:
+        self.collection = collection
+        self.hash_field = hash_field
+        self.time_field = time_field
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        try:
+            collection.create_index("code")
+        except Exception as exc:
+            print(f"⚠️ 無法建立 {collection.name} code 索引: {exc}")
+        self._hashes = {
+            doc["code"]: doc.get(hash_field)
+            for doc in collection.find({}, {"_id": 0, "code": 1, hash_field: 1})
+            if doc.get("code")
+        }
+        self._operations: list[UpdateOne] = []
+        self._last_flush = time.monotonic()
+        self._lock = Lock()
+        self.written = 0
+        self.skipped = 0
+
+    def add(self, code: str, payload: dict) -> bool:
+        digest = _content_hash(payload)
+        with self._lock:
+            if self._hashes.get(code) == digest:
+                self.skipped += 1
+                return False
+            self._hashes[code] = digest
+            update = {**payload, self.hash_field: digest, self.time_field: _current_timestamp()}
+            self._operations.append(UpdateOne({"code": code}, {"$set": update}, upsert=True))
+            if (
+                len(self._operations) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_seconds
+            ):
+                self._flush_locked()
+        return True
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if self._operations:
+            self.collection.bulk_write(self._operations, ordered=False)
+            self.written += len(self._operations)
+            self._operations = []
+        self._last_flush = time.monotonic()
+
+
+def _sync_yahoo_turnover_items(collection_name: str, items: list[dict]) -> None:
+    """Make the tech collection's code list match `items` without emptying it first.
+
+    Changed rows are upserted, then codes that left the list are removed, so
+    readers never see an empty collection mid-run and kept rows retain their
+    TradingView fields.
+    """
     if not items:
         return
 
-    client = MongoClient(MONGO_URI)
-    db = client[WANTGOO_DB_NAME]
-    collection = db[collection_name]
-    collection.delete_many({})
-    timestamp = _current_timestamp()
-    operations = []
+    client = get_mongo_client(MONGO_URI)
+    collection = client[WANTGOO_DB_NAME][collection_name]
+    writer = _WantgooBatchWriter(collection, "base_hash", "base_updated_time", batch_size=len(items))
+    codes = []
 
     for item in items:
         code = str(item.get("code", "")).strip()
         if not code:
             continue
-        payload = {
+        codes.append(code)
+        writer.add(code, with_numeric_fields({
             "no": item.get("no"),
             "code": code,
             "name": item.get("name", ""),
@@ -252,24 +558,15 @@ def _upsert_yahoo_turnover_items(collection_name: str, items: list[dict]) -> Non
             "close": item.get("close", ""),
             "high": item.get("high", ""),
             "low": item.get("low", ""),
-            "tv_updated_time": timestamp,
-        }
-        operations.append(UpdateOne({"code": code}, {"$set": payload}, upsert=True))
+        }, TURNOVER_NUMERIC_FIELDS))
 
-    if operations:
-        collection.bulk_write(operations, ordered=False)
-
-
-def update_wantgoo_doc_by_code(date: str, symbol: str, payload: dict) -> None:
-    client = MongoClient(MONGO_URI)
-    db = client[WANTGOO_DB_NAME]
-    collection = db[date]
-    payload = {**payload, "tv_updated_time": _current_timestamp()}
-    collection.update_one({"code": symbol}, {"$set": payload}, upsert=True)
+    writer.flush()
+    removed = collection.delete_many({"code": {"$nin": codes}}).deleted_count if codes else 0
+    print(f"✅ 成交值排行同步：寫入 {writer.written} 筆、未變動 {writer.skipped} 筆、移除 {removed} 筆")
 
 
 def get_yahoo_turnover():
-    client = MongoClient(MONGO_URI)
+    client = get_mongo_client(MONGO_URI)
     db = client[TURNOVER_DB_NAME]
     collection_name = _get_latest_turnover_collection_name(db)
     if not collection_name:
@@ -280,7 +577,7 @@ def get_yahoo_turnover():
         return pd.DataFrame(), collection_name
 
     data_items = doc.get("data", [])
-    _upsert_yahoo_turnover_items(collection_name, data_items)
+    _sync_yahoo_turnover_items(collection_name, data_items)
 
     rows = []
     for item in data_items:
@@ -294,7 +591,7 @@ def get_yahoo_turnover():
 
 
 def get_etf_common_holdings():
-    client = MongoClient(MONGO_URI)
+    client = get_mongo_client(MONGO_URI)
     db = client[ETF_DB_NAME]
     code_name_map: dict[str, str] = {}
     code_counts: dict[str, int] = {}
@@ -324,12 +621,10 @@ def get_etf_common_holdings():
 
 
 def _get_tradingview_url(symbol: str) -> str | None:
-    info = stock_list.get(symbol)
-    if not info:
-        return None
-    if info.get("market") == "tpex":
+    market = get_stock_market(symbol)
+    if market == "tpex":
         return f"https://tw.tradingview.com/chart/rABGcFih/?symbol=TPEX%3A{symbol}"
-    if info.get("market") == "twse":
+    if market == "twse":
         return f"https://tw.tradingview.com/chart/rABGcFih/?symbol=TWSE%3A{symbol}"
     return None
 
@@ -341,13 +636,121 @@ def _fetch_tradingview_metrics(symbol: str) -> dict:
     return _fetch_tradingview_metrics_by_url(url)
 
 
-def _get_tradingview_forecast_url(symbol: str) -> str | None:
-    info = stock_list.get(symbol)
-    if not info:
+def _use_tab(driver: webdriver.Chrome, tab: str) -> None:
+    """Switch to this worker's `tab` ("chart" / "forecast"), opening it on first use."""
+    tabs = _driver_local.tabs
+    handle = tabs.get(tab)
+    if handle is not None and handle in driver.window_handles:
+        if driver.current_window_handle != handle:
+            driver.switch_to.window(handle)
+        return
+    if tabs:
+        driver.switch_to.new_window("tab")
+    tabs[tab] = driver.current_window_handle
+
+
+def _open_in_tab(tab: str, url: str) -> webdriver.Chrome:
+    driver = _get_driver()
+    try:
+        _use_tab(driver, tab)
+        driver.get(url)
+    except Exception as exc:
+        if not _is_driver_crash(exc):
+            raise
+        driver = _reset_driver()
+        _use_tab(driver, tab)
+        driver.get(url)
+
+    WebDriverWait(driver, 20).until(
+        lambda d: d.execute_script("return document.readyState") == "complete"
+    )
+    return driver
+
+
+# 切換商品後，這些欄位全部變動才視為新商品的數值已載入（訊號欄位 0/1 可能與前一檔相同，不列入）
+_SYMBOL_CHANGE_FIELDS = ("close", "ma5_1d", "ma10_1d", "ma20_1d", "ma50_1d", "ma100_1d")
+
+_SET_CHART_SYMBOL_SCRIPT = """
+try {
+  const chart = window.TradingViewApi && window.TradingViewApi.activeChart();
+  if (chart) {
+    chart.setSymbol(arguments[0]);
+    return true;
+  }
+} catch (e) {}
+return false;
+"""
+
+# 圖表目前實際顯示的商品（例如 "TWSE:2330"）；沒有 in-page API 時回傳 null
+_CHART_SYMBOL_SCRIPT = """
+try {
+  const chart = window.TradingViewApi && window.TradingViewApi.activeChart();
+  return chart ? chart.symbol() : null;
+} catch (e) {}
+return null;
+"""
+
+
+def _chart_shows_symbol(shown: object, symbol: str) -> bool:
+    """True when the chart's symbol ("TWSE:2330" or "2330") is the requested `symbol`."""
+    shown_text = str(shown or "").strip().upper()
+    wanted = symbol.strip().upper()
+    if not shown_text:
+        return False
+    if ":" in shown_text and ":" in wanted:
+        return shown_text == wanted
+    return shown_text.split(":")[-1] == wanted.split(":")[-1]
+
+
+def _chart_layout(url: str) -> str:
+    return urlparse(url).path
+
+
+def _switch_chart_symbol(url: str) -> dict | None:
+    """Change the symbol on the already loaded chart tab and read the new legend values.
+
+    Returns None when a full page load is needed: no chart loaded yet, a different
+    layout, no in-page chart API, or the chart does not show `symbol` with legend
+    values that moved away from the previous symbol's.
+    """
+    chart = getattr(_driver_local, "chart", None)
+    symbol = parse_qs(urlparse(url).query).get("symbol", [""])[0]
+    if not chart or not symbol or chart[0] != _chart_layout(url):
+        return None
+    previous = chart[1]
+
+    driver = _get_driver()
+    _use_tab(driver, "chart")
+    if not driver.execute_script(_SET_CHART_SYMBOL_SCRIPT, symbol):
+        # 沒有 in-page API 就重新載入頁面，不對目前焦點盲打代號
+        return None
+
+    last: dict[str, str] = {}
+
+    def legend_switched(d: webdriver.Chrome) -> bool:
+        nonlocal last
+        raw = d.execute_script(_XPATH_TEXTS_SCRIPT, TRADINGVIEW_XPATHS) or {}
+        current = {key: (raw.get(key) or "").replace(",", "") for key in TRADINGVIEW_XPATHS}
+        changed = all(current[key] and current[key] != previous.get(key) for key in _SYMBOL_CHANGE_FIELDS)
+        stable = current == last
+        last = current
+        # 舊商品的即時報價也會讓 close / 均線變動，必須確認圖表真的換成了這檔商品
+        shown = _chart_shows_symbol(d.execute_script(_CHART_SYMBOL_SCRIPT), symbol)
+        return shown and changed and stable and all(current.values())
+
+    try:
+        WebDriverWait(driver, TV_SYMBOL_SWITCH_TIMEOUT, poll_frequency=0.25).until(legend_switched)
+    except TimeoutException:
+        print(f"⚠️ {symbol} 切換商品後未確認為新商品的指標，改為重新載入頁面")
         return None
-    if info.get("market") == "tpex":
+    return last
+
+
+def _get_tradingview_forecast_url(symbol: str) -> str | None:
+    market = get_stock_market(symbol)
+    if market == "tpex":
         market = "TPEX"
-    elif info.get("market") == "twse":
+    elif market == "twse":
         market = "TWSE"
     else:
         return None
@@ -355,24 +758,45 @@ def _get_tradingview_forecast_url(symbol: str) -> str | None:
 
 
 def _fetch_tradingview_forecast_metrics(symbol: str) -> dict:
+    """Forecast metrics for `symbol`, scraped at most once per TV_FORECAST_MAX_AGE_HOURS.
+
+    Complete results and symbols without a forecast page are kept in Mongo so
+    every worker and later runs reuse them. Blank or all-zero results (a slow
+    or half-rendered page) are not cached, so the next run scrapes again.
+    """
+    collection = get_mongo_client(MONGO_URI)[TV_CACHE_DB_NAME][TV_FORECAST_CACHE_COLLECTION]
+    cached = collection.find_one({"_id": symbol})
+    if cached and time.time() - float(cached.get("fetched_ts", 0)) < TV_FORECAST_MAX_AGE_HOURS * 3600:
+        return cached.get("metrics", {})
+
+    metrics = _scrape_tradingview_forecast_metrics(symbol)
+    if metrics and not _is_complete_forecast(metrics):
+        print(f"⚠️ {symbol} forecast 資料不完整，本次不寫入快取")
+        return metrics
+    collection.replace_one(
+        {"_id": symbol},
+        {"metrics": metrics, "fetched_ts": time.time(), "fetched_time": _current_timestamp()},
+        upsert=True,
+    )
+    return metrics
+
+
+def _is_complete_forecast(metrics: dict) -> bool:
+    """True when the target price and every analyst score were read and the scores are not all zero."""
+    if not str(metrics.get("target_price") or "").strip():
+        return False
+    scores = [_safe_float(metrics.get(score_key)) for score_key, _ in TRADINGVIEW_ANALYST_RATING_LABELS]
+    if any(score is None for score in scores):
+        return False
+    return not (all(score == 0 for score in scores) or scores[0] == scores[1] == 0)
+
+
+def _scrape_tradingview_forecast_metrics(symbol: str) -> dict:
     url = _get_tradingview_forecast_url(symbol)
     if not url:
         return {}
 
-    driver = _get_driver()
-    try:
-        driver.get(url)
-    except Exception as exc:
-        message = str(exc).lower()
-        if "invalid session id" in message or "disconnected" in message:
-            driver = _reset_driver()
-            driver.get(url)
-        else:
-            raise
-
-    WebDriverWait(driver, 20).until(
-        lambda d: d.execute_script("return document.readyState") == "complete"
-    )
+    driver = _open_in_tab("forecast", url)
 
     title_text = (driver.title or "").lower()
     source_head = (driver.page_source or "")[:6000].lower()
@@ -434,55 +858,29 @@ def _fetch_tradingview_forecast_metrics(symbol: str) -> dict:
 
 
 def _fetch_tradingview_metrics_by_url(url: str) -> dict:
-    driver = _get_driver()
-    try:
-        driver.get(url)
-    except Exception as exc:
-        message = str(exc).lower()
-        if "invalid session id" in message or "disconnected" in message:
-            driver = _reset_driver()
-            driver.get(url)
-        else:
-            raise
-
-    WebDriverWait(driver, 20).until(
-        lambda d: d.execute_script("return document.readyState") == "complete"
-    )
-
-    sqzmom_stronger_value_2d_text = _get_text_by_xpath(
-        driver, TRADINGVIEW_XPATHS["sqzmom_stronger_1d"]
-    )
-
-    heikin_Ashi_raw = _get_text_by_xpath(driver, TRADINGVIEW_XPATHS["heikin_Ashi"]).strip()
+    texts = _switch_chart_symbol(url) if TV_SYMBOL_SWITCH else None
+    if texts is None:
+        driver = _open_in_tab("chart", url)
+        texts = _get_texts_by_xpaths(driver, TRADINGVIEW_XPATHS)
+    _driver_local.chart = (_chart_layout(url), texts)
+    sqzmom_stronger_value_2d_text = texts["sqzmom_stronger_1d"]
+
+    heikin_Ashi_raw = texts["heikin_Ashi"].strip()
     heikin_Ashi_text = "1" if heikin_Ashi_raw == "∅" else "0"
 
-    ma5_1D_text = _get_text_by_xpath(driver, TRADINGVIEW_XPATHS["ma5_1d"])
-    ma10_1D_text = _get_text_by_xpath(driver, TRADINGVIEW_XPATHS["ma10_1d"])
-    ma20_1D_text = _get_text_by_xpath(driver, TRADINGVIEW_XPATHS["ma20_1d"])
-    ma50_1D_text = _get_text_by_xpath(driver, TRADINGVIEW_XPATHS["ma50_1d"])
-    ma100_1D_text = _get_text_by_xpath(driver, TRADINGVIEW_XPATHS["ma100_1d"])
-    entry_signal_text = _normalize_binary_text(
-        _get_text_by_xpath(driver, TRADINGVIEW_XPATHS["entry_signal"])
-    )
-    add_position_signal_text = _normalize_binary_text(
-        _get_text_by_xpath(driver, TRADINGVIEW_XPATHS["add_position_signal"])
-    )
-    buyback_signal_text = _normalize_binary_text(
-        _get_text_by_xpath(driver, TRADINGVIEW_XPATHS["buyback_signal"])
-    )
-    reduce_1_signal_text = _normalize_binary_text(
-        _get_text_by_xpath(driver, TRADINGVIEW_XPATHS["reduce_1_signal"])
-    )
-    reduce_2_signal_text = _normalize_binary_text(
-        _get_text_by_xpath(driver, TRADINGVIEW_XPATHS["reduce_2_signal"])
-    )
-    clear_position_signal_text = _normalize_binary_text(
-        _get_text_by_xpath(driver, TRADINGVIEW_XPATHS["clear_position_signal"])
-    )
-    has_position_signal_text = _normalize_binary_text(
-        _get_text_by_xpath(driver, TRADINGVIEW_XPATHS["has_position_signal"])
-    )
-    close_1D_text = _get_text_by_xpath(driver, TRADINGVIEW_XPATHS["close"])
+    ma5_1D_text = texts["ma5_1d"]
+    ma10_1D_text = texts["ma10_1d"]
+    ma20_1D_text = texts["ma20_1d"]
+    ma50_1D_text = texts["ma50_1d"]
+    ma100_1D_text = texts["ma100_1d"]
+    entry_signal_text = _normalize_binary_text(texts["entry_signal"])
+    add_position_signal_text = _normalize_binary_text(texts["add_position_signal"])
+    buyback_signal_text = _normalize_binary_text(texts["buyback_signal"])
+    reduce_1_signal_text = _normalize_binary_text(texts["reduce_1_signal"])
+    reduce_2_signal_text = _normalize_binary_text(texts["reduce_2_signal"])
+    clear_position_signal_text = _normalize_binary_text(texts["clear_position_signal"])
+    has_position_signal_text = _normalize_binary_text(texts["has_position_signal"])
+    close_1D_text = texts["close"]
 
     return {
         "sqzmom_stronger_1d": sqzmom_stronger_value_2d_text,
@@ -513,11 +911,13 @@ def get_tv_dataT():
         return []
     start_idx = 0
     end_idx = len(all_docs)
+    writer = _WantgooBatchWriter(get_mongo_client(MONGO_URI)[WANTGOO_DB_NAME][date], "tv_hash", "tv_updated_time")
 
     # https://tw.tradingview.com/chart/rABGcFih/?symbol=TWSE%3A2454
     # https://tw.tradingview.com/chart/rABGcFih/?symbol=TPEX%3A8069
     # 1. 取得 data 欄位（如果沒有就回傳空 list）
-    for idx, doc in all_docs.iloc[start_idx:end_idx].iterrows():
+    def scrape(task) -> str | None:
+        idx, doc = task
         url = ''
 
         # _id = doc["_id"]
@@ -525,25 +925,25 @@ def get_tv_dataT():
         name = doc.get("name")
         print(name, symbol)
 
-        info = stock_list.get(symbol)  # 取不到會回傳 None
-        if not info:
+        market = get_stock_market(symbol)  # 取不到會回傳 None
+        if market is None:
             print(f"⚠️ 找不到 {symbol}，略過")
-            continue
+            return None
 
-        if stock_list[symbol]["market"] == 'tpex':
+        if market == 'tpex':
             url = f"https://tw.tradingview.com/chart/rABGcFih/?symbol=TPEX%3A{symbol}"
 
-        if stock_list[symbol]["market"] == 'twse':
+        if market == 'twse':
             url = f"https://tw.tradingview.com/chart/rABGcFih/?symbol=TWSE%3A{symbol}"
 
         metrics = _fetch_tradingview_metrics_by_url(url)
         if not metrics:
             print(f"⚠️ 找不到 {symbol}，略過")
-            continue
+            return None
         try:
             forecast_metrics = _fetch_tradingview_forecast_metrics(symbol)
         except Exception as exc:
-            print(f"⚠️ {symbol} 抓取 forecast 失敗，略過 forecast 欄位: {repr(exc)}")
+            print(f"⚠️ {symbol} 抓取 forecast 失敗，清空 forecast 欄位: {repr(exc)}")
             forecast_metrics = {}
 
         sqzmom_stronger_value_2d_text = metrics.get("sqzmom_stronger_1d", "")
@@ -578,10 +978,9 @@ def get_tv_dataT():
         print("get 有部位訊號 Finish", has_position_signal_text)
         print("get target price Finish", target_price_text)
 
-        update_wantgoo_doc_by_code(
-            date,
+        writer.add(
             symbol,
-            {
+            {**with_tv_numbers({
                 "sqzmom_stronger_1d": sqzmom_stronger_value_2d_text,
                 "heikin_Ashi": heikin_Ashi_text,
                 "ma5_1d": ma5_1D_text,
@@ -602,10 +1001,23 @@ def get_tv_dataT():
                 "hold_score": forecast_metrics.get("hold_score", ""),
                 "sell_score": forecast_metrics.get("sell_score", ""),
                 "strong_sell_score": forecast_metrics.get("strong_sell_score", ""),
-            }
+            }), "tv_status": "ok"},
         )
-        time.sleep(1)
         print(f"✅ 已更新 {idx} {name} ({symbol}) 的 TradingView 資料")
+        return symbol
+
+    started = time.perf_counter()
+    tasks = list(all_docs.iloc[start_idx:end_idx].iterrows())
+    updated = _run_symbol_tasks(tasks, scrape)
+    # 略過或抓取失敗的代號清空 TradingView 欄位，不讓上一輪的值看起來像本輪結果
+    failed = {doc.get("symbol") for _, doc in tasks} - set(updated) - {None, ""}
+    for symbol in sorted(failed):
+        writer.add(symbol, _failed_tv_payload())
+    writer.flush()
+    print(
+        f"⏱️ 成交值排行 TradingView 抓取 {len(updated)}/{len(tasks)} 檔（失敗 {len(failed)}、寫入 {writer.written}、未變動 {writer.skipped}），"
+        f"耗時 {time.perf_counter() - started:.1f}s"
+    )
 
 
 def get_tv_data_etf_common() -> None:
@@ -614,10 +1026,10 @@ def get_tv_data_etf_common() -> None:
         print("❌ 找不到 ETF 共同持股")
         return
 
-    items: list[dict] = []
     timestamp = _current_timestamp()
 
-    for idx, doc in enumerate(holdings, start=1):
+    def scrape(task) -> dict | None:
+        idx, doc = task
         symbol = doc.get("symbol")
         name = doc.get("name", "")
         print(name, symbol)
@@ -626,10 +1038,10 @@ def get_tv_data_etf_common() -> None:
             metrics = _fetch_tradingview_metrics(symbol)
         except Exception as exc:
             print(f"⚠️ {symbol} 抓取 TradingView 失敗，略過: {repr(exc)}")
-            continue
+            return None
         if not metrics:
             print(f"⚠️ 找不到 {symbol}，略過")
-            continue
+            return None
         try:
             forecast_metrics = _fetch_tradingview_forecast_metrics(symbol)
         except Exception as exc:
@@ -663,10 +1075,13 @@ def get_tv_data_etf_common() -> None:
             "strong_sell_score": forecast_metrics.get("strong_sell_score", ""),
             "tv_updated_time": timestamp,
         }
-        items.append(payload)
-        time.sleep(1)
+        return with_tv_numbers(payload)
+
+    started = time.perf_counter()
+    items = _run_symbol_tasks(list(enumerate(holdings, start=1)), scrape)
+    print(f"⏱️ ETF 共同持股 TradingView 抓取 {len(items)}/{len(holdings)} 檔，耗時 {time.perf_counter() - started:.1f}s")
 
-    client = MongoClient(MONGO_URI)
+    client = get_mongo_client(MONGO_URI)
     collection = client[ETF_DB_NAME][ETF_COMMON_TECH_COLLECTION]
     payload = {
         "_id": "latest",
@@ -682,27 +1097,27 @@ def get_tv_data_index_tw_code() -> None:
         print("❌ 找不到 indexAndFuture.json 內容")
         return
 
-    items: list[dict] = []
     timestamp = _current_timestamp()
 
-    for idx, (key, info) in enumerate(index_list.items(), start=1):
+    def scrape(task) -> dict | None:
+        idx, (key, info) = task
         tw_code = str(info.get("tw_code", "")).strip()
         if not tw_code:
-            continue
+            return None
         url = str(info.get("url", "")).strip()
         if not url:
             print(f"⚠️ {key} 缺少 url，略過")
-            continue
+            return None
         name = str(info.get("ch_name", "")).strip()
 
         try:
             metrics = _fetch_tradingview_metrics_by_url(url)
         except Exception as exc:
             print(f"⚠️ {key} 抓取 TradingView 失敗，略過: {repr(exc)}")
-            continue
+            return None
         if not metrics:
             print(f"⚠️ {key} 無法取得 TradingView 資料，略過")
-            continue
+            return None
 
         price_value = _safe_float(metrics.get("close"))
 
@@ -727,10 +1142,14 @@ def get_tv_data_index_tw_code() -> None:
             "has_position_signal": metrics.get("has_position_signal", ""),
             "tv_updated_time": timestamp,
         }
-        items.append(payload)
-        time.sleep(1)
+        return with_tv_numbers(payload)
 
-    client = MongoClient(MONGO_URI)
+    started = time.perf_counter()
+    tasks = list(enumerate(index_list.items(), start=1))
+    items = _run_symbol_tasks(tasks, scrape)
+    print(f"⏱️ 指數 TradingView 抓取 {len(items)}/{len(tasks)} 檔，耗時 {time.perf_counter() - started:.1f}s")
+
+    client = get_mongo_client(MONGO_URI)
     collection = client["FutureIndex"]["index"]
     payload = {
         "_id": "latest",
@@ -781,6 +1200,9 @@ if __name__ == "__main__":
         daytime_target = _next_daytime_run(now)
         return min(daily_target, daytime_target)
 
+    # 舊版把 forecast 快取放在 WANTGOO_DB_NAME 裡，清掉該集合（只是快取，會在新位置重建）
+    get_mongo_client(MONGO_URI)[WANTGOO_DB_NAME].drop_collection(TV_FORECAST_CACHE_COLLECTION)
+
     while True:
         now = datetime.now()
         next_run = _next_run_time(now)
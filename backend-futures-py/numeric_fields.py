@@ -0,0 +1,89 @@
+"""Typed copies of numeric display strings, added when documents are written.
+
+Scraped values are stored as the text the site shows ("1,234,000", "5.32%",
+"−12.50"). Next to each such field `<field>_num` holds the parsed number (or
+None when the text is not numeric), so readers never re-parse the strings.
+"""
+
+from __future__ import annotations
+
+import re
+from decimal import Decimal
+
+NUMERIC_SUFFIX = "_num"
+
+HOLDING_NUMERIC_FIELDS = ("holding_count", "weight")
+HOLDING_INTEGER_FIELDS = ("holding_count",)
+
+TURNOVER_NUMERIC_FIELDS = ("volume", "close", "high", "low")
+
+TV_NUMERIC_FIELDS = (
+    "close",
+    "sqzmom_stronger_1d",
+    "heikin_Ashi",
+    "ma5_1d",
+    "ma10_1d",
+    "ma20_1d",
+    "ma50_1d",
+    "ma100_1d",
+    "entry_signal",
+    "add_position_signal",
+    "buyback_signal",
+    "reduce_1_signal",
+    "reduce_2_signal",
+    "clear_position_signal",
+    "has_position_signal",
+    "target_price",
+    "strong_buy_score",
+    "buy_score",
+    "hold_score",
+    "sell_score",
+    "strong_sell_score",
+)
+
+# 數字後面只允許 %、K/M/B/T 縮寫（換算倍數）或明確的幣別（例如 "5.32%"、"1.23M"、"1,350.00 TWD"）
+_MAGNITUDES = {"K": 10**3, "M": 10**6, "B": 10**9, "T": 10**12}
+_CURRENCY_CODES = ("TWD", "USD")
+_NUMBER_PATTERN = re.compile(
+    r"([+-]?(?:\d+\.?\d*|\.\d+))\s*(%|[KMBT]|" + "|".join(_CURRENCY_CODES) + r")?"
+)
+
+
+def parse_number(value: object) -> float | None:
+    """Parse a display string such as "1,234.5", "5.32%", "1.23M" or "−3.1" into a float.
+
+    Any suffix other than %, K/M/B/T or a known currency code yields None.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if value is None:
+        return None
+    text = str(value).replace(",", "").replace("−", "-").strip()
+    match = _NUMBER_PATTERN.fullmatch(text)
+    if not match:
+        return None
+    # 以 Decimal 相乘，避免 "1.1K" 變成 1100.0000000000002
+    return float(Decimal(match.group(1)) * _MAGNITUDES.get(match.group(2) or "", 1))
+
+
+def with_numeric_fields(doc: dict, fields: tuple[str, ...], integer_fields: tuple[str, ...] = ()) -> dict:
+    """Return a copy of `doc` with `<field>_num` set for every field present in it."""
+    typed = dict(doc)
+    for field in fields:
+        if field not in doc:
+            continue
+        number = parse_number(doc[field])
+        if number is not None and field in integer_fields:
+            number = int(number)
+        typed[field + NUMERIC_SUFFIX] = number
+    return typed
+
+
+def with_holding_numbers(row: dict) -> dict:
+    return with_numeric_fields(row, HOLDING_NUMERIC_FIELDS, HOLDING_INTEGER_FIELDS)
+
+
+def with_tv_numbers(payload: dict) -> dict:
+    return with_numeric_fields(payload, TV_NUMERIC_FIELDS)
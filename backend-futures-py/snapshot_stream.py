@@ -0,0 +1,211 @@
+"""Server-Sent Events fan-out for the market API.
+
+One hub thread reads each topic's latest snapshot once per poll interval and
+pushes changed snapshots to every subscribed socket, so the Mongo load does
+not grow with the number of dashboard viewers.
+
+Backpressure: a subscriber holds at most one unsent event per topic. A newer
+snapshot replaces an older one the client has not received yet, and a client
+whose socket has not drained for SSE_STALL_SECONDS is disconnected.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import time
+from threading import Event, Lock, Thread
+from typing import Callable
+
+# 預設值；實際設定在使用時才從 env 讀取
+SSE_DEFAULTS = {
+    "SSE_POLL_SECONDS": "1",
+    "SSE_FLUSH_SECONDS": "0.2",
+    "SSE_HEARTBEAT_SECONDS": "15",
+    "SSE_STALL_SECONDS": "30",
+    "SSE_MAX_SUBSCRIBERS": "500",
+}
+
+
+def sse_setting(name: str) -> float:
+    """Current value of one SSE_* setting.
+
+    Read on every call because the market API loads .env after its imports.
+    """
+    return float(os.getenv(name, SSE_DEFAULTS[name]))
+
+
+HEARTBEAT_EVENT = b": keepalive\n\n"
+
+
+def format_sse_event(topic: str, payload: dict) -> bytes:
+    data = json.dumps(payload, ensure_ascii=False)
+    return f"event: {topic}\ndata: {data}\n\n".encode("utf-8")
+
+
+class _Subscriber:
+    def __init__(self, sock: socket.socket, topics: set[str]) -> None:
+        self.sock = sock
+        self.topics = topics
+        self.pending: dict[str, bytes] = {}
+        self.buffer = b""
+        self.blocked_since: float | None = None
+        self.last_write = time.monotonic()
+
+    def flush(self, now: float) -> bool:
+        """Send as much as the socket accepts; False means the client is gone."""
+        try:
+            if self.sock.recv(1, socket.MSG_PEEK) == b"":
+                return False
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            return False
+        if not self.buffer and self.pending:
+            self.buffer = b"".join(self.pending.values())
+            self.pending.clear()
+        while self.buffer:
+            try:
+                sent = self.sock.send(self.buffer)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                return False
+            self.buffer = self.buffer[sent:]
+            self.last_write = now
+        if self.buffer:
+            if self.blocked_since is None:
+                self.blocked_since = now
+            return now - self.blocked_since < sse_setting("SSE_STALL_SECONDS")
+        self.blocked_since = None
+        return True
+
+    def close(self) -> None:
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class SnapshotHub:
+    """Poll each topic once per interval and fan changed snapshots out to subscribers."""
+
+    def __init__(self, topics: dict[str, Callable[[], dict]], poll_seconds: float | None = None) -> None:
+        self.topics = topics
+        # None：每輪從 SSE_POLL_SECONDS 讀取
+        self.poll_seconds = poll_seconds
+        self._subscribers: list[_Subscriber] = []
+        self._latest: dict[str, bytes] = {}
+        self._lock = Lock()
+        self._wakeup = Event()
+        self._thread: Thread | None = None
+        self.upstream_reads = 0
+        self.events_queued = 0
+        self.events_coalesced = 0
+        self.dropped = 0
+
+    def subscribe(self, sock: socket.socket, topics: set[str]) -> bool:
+        """Hand a socket whose SSE headers are already written over to the hub."""
+        with self._lock:
+            if len(self._subscribers) >= sse_setting("SSE_MAX_SUBSCRIBERS"):
+                return False
+            sock.setblocking(False)
+            subscriber = _Subscriber(sock, topics)
+            for topic in topics:
+                if topic in self._latest:
+                    subscriber.pending[topic] = self._latest[topic]
+            self._subscribers.append(subscriber)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name="sse-hub", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return True
+
+    def has_capacity(self) -> bool:
+        with self._lock:
+            return len(self._subscribers) < sse_setting("SSE_MAX_SUBSCRIBERS")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "upstream_reads": self.upstream_reads,
+                "events_queued": self.events_queued,
+                "events_coalesced": self.events_coalesced,
+                "dropped": self.dropped,
+            }
+
+    def _poll(self, topics: set[str]) -> dict[str, bytes]:
+        changed = {}
+        for topic in topics:
+            try:
+                payload = self.topics[topic]()
+            except Exception as exc:
+                print(f"⚠️ SSE 讀取 {topic} 失敗: {exc}")
+                continue
+            with self._lock:
+                self.upstream_reads += 1
+            if not payload:
+                continue
+            event = format_sse_event(topic, payload)
+            if self._latest.get(topic) != event:
+                changed[topic] = event
+        return changed
+
+    def _run(self) -> None:
+        next_poll = 0.0
+        while True:
+            with self._lock:
+                subscribers = list(self._subscribers)
+            if not subscribers:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                next_poll = 0.0
+                continue
+
+            now = time.monotonic()
+            if now >= next_poll:
+                wanted = set().union(*(subscriber.topics for subscriber in subscribers))
+                changed = self._poll(wanted)
+                poll_seconds = self.poll_seconds
+                if poll_seconds is None:
+                    poll_seconds = sse_setting("SSE_POLL_SECONDS")
+                next_poll = now + poll_seconds
+                # Publish and queue under one lock so a concurrent subscriber
+                # either receives the change here or picks it up from _latest,
+                # and stats() never sees the counters mid-update.
+                with self._lock:
+                    self._latest.update(changed)
+                    subscribers = list(self._subscribers)
+                    for subscriber in subscribers:
+                        for topic, event in changed.items():
+                            if topic not in subscriber.topics:
+                                continue
+                            if topic in subscriber.pending:
+                                self.events_coalesced += 1
+                            subscriber.pending[topic] = event
+                            self.events_queued += 1
+
+            gone = []
+            heartbeat_seconds = sse_setting("SSE_HEARTBEAT_SECONDS")
+            for subscriber in subscribers:
+                if (
+                    not subscriber.buffer
+                    and not subscriber.pending
+                    and now - subscriber.last_write >= heartbeat_seconds
+                ):
+                    subscriber.pending["_heartbeat"] = HEARTBEAT_EVENT
+                if not subscriber.flush(now):
+                    gone.append(subscriber)
+            if gone:
+                with self._lock:
+                    for subscriber in gone:
+                        self._subscribers.remove(subscriber)
+                        self.dropped += 1
+                for subscriber in gone:
+                    subscriber.close()
+
+            self._wakeup.wait(sse_setting("SSE_FLUSH_SECONDS"))
+            self._wakeup.clear()
@@ -8,7 +8,10 @@ from __future__ import annotations
 
 import csv
 import os
+import shutil
+import tempfile
 from datetime import datetime
+from threading import Lock
 from typing import Any
 
 from zoneinfo import ZoneInfo
@@ -19,6 +22,10 @@ except Exception:  # pragma: no cover - fallback for environments without option
     _base_shortcycle_send_discord_message = None
 
 TZ = ZoneInfo("Asia/Taipei")
+TAIL_READ_BLOCK_SIZE = 8192
+
+_CSV_HEADER_CACHE: dict[str, tuple[int, int, int, tuple[str, ...]]] = {}
+_CSV_HEADER_LOCK = Lock()
 
 
 def to_float(value: Any) -> float | None:
@@ -34,21 +41,56 @@ def to_float(value: Any) -> float | None:
         return None
 
 
+def _read_csv_header(handle) -> list[str]:
+    """Parse the first line of a binary CSV handle as the header row."""
+    handle.seek(0)
+    first_line = handle.readline().decode("utf-8")
+    return next(csv.reader([first_line]), [])
+
+
+def _read_tail_lines(handle, count: int) -> list[str]:
+    """Return up to `count` non-empty data lines from the end of a binary CSV handle.
+
+    Reads backwards from EOF in fixed-size blocks so the cost depends on the
+    number of requested rows, not on the size of the file. The header line is
+    never included.
+    """
+    handle.seek(0, os.SEEK_END)
+    position = handle.tell()
+    buffer = b""
+    lines: list[bytes] = []
+    while position > 0:
+        read_size = min(TAIL_READ_BLOCK_SIZE, position)
+        position -= read_size
+        handle.seek(position)
+        buffer = handle.read(read_size) + buffer
+        pieces = buffer.split(b"\n")
+        # The first piece is the header (at BOF) or a partial line (mid-file).
+        lines = [line for line in pieces[1:] if line.rstrip(b"\r")]
+        if len(lines) >= count:
+            break
+    return [line.decode("utf-8") for line in lines[-count:]]
+
+
 def read_last_n_rows(path: str, count: int) -> list[dict]:
-    """Return the last `count` rows from a CSV as dictionaries."""
+    """Return the last `count` rows from a CSV as dictionaries.
+
+    Only the header and the trailing lines are parsed, so the per-call cost
+    stays flat as the file grows.
+    """
     if count <= 0 or not os.path.isfile(path):
         return []
 
     try:
-        with open(path, "r", newline="", encoding="utf-8") as handle:
-            rows = list(csv.DictReader(handle))
+        with open(path, "rb") as handle:
+            header = _read_csv_header(handle)
+            if not header:
+                return []
+            lines = _read_tail_lines(handle, count)
+        return list(csv.DictReader(lines, fieldnames=header))
     except Exception:
         return []
 
-    if count >= len(rows):
-        return rows
-    return rows[-count:]
-
 
 def format_mxf_number(value: Any) -> str:
     """Format MXF numeric fields without trailing decimals when possible."""
@@ -62,23 +104,20 @@ def format_mxf_number(value: Any) -> str:
 
 def get_latest_mxf_snapshot(mxf_value_csv_path: str) -> dict[str, str]:
     """Read the newest non-empty MXF snapshot from `mxf_value.csv`."""
-    if not os.path.isfile(mxf_value_csv_path):
-        return {"tx_bvav": "", "mtx_bvav": "", "mtx_bvav_avg": ""}
-
-    try:
-        with open(mxf_value_csv_path, "r", newline="", encoding="utf-8") as handle:
-            rows = list(csv.DictReader(handle))
-    except Exception:
-        return {"tx_bvav": "", "mtx_bvav": "", "mtx_bvav_avg": ""}
-
-    for row in reversed(rows):
-        snapshot = {
-            "tx_bvav": str(row.get("tx_bvav", "")).strip(),
-            "mtx_bvav": str(row.get("mtx_bvav", "")).strip(),
-            "mtx_bvav_avg": str(row.get("mtx_bvav_avg", "")).strip(),
-        }
-        if any(snapshot.values()):
-            return snapshot
+    count = 16
+    while True:
+        rows = read_last_n_rows(mxf_value_csv_path, count)
+        for row in reversed(rows):
+            snapshot = {
+                "tx_bvav": str(row.get("tx_bvav", "")).strip(),
+                "mtx_bvav": str(row.get("mtx_bvav", "")).strip(),
+                "mtx_bvav_avg": str(row.get("mtx_bvav_avg", "")).strip(),
+            }
+            if any(snapshot.values()):
+                return snapshot
+        if len(rows) < count:
+            break
+        count *= 4
 
     return {"tx_bvav": "", "mtx_bvav": "", "mtx_bvav_avg": ""}
 
@@ -112,32 +151,77 @@ def build_shortcycle_send_discord_message(mxf_value_csv_path: str):
     return _send
 
 
+def _write_csv_atomic(path: str, header: list[str], rows: list[list[str]]) -> None:
+    """Write a CSV to a temp file in the same directory, then rename it into place."""
+    fd, temp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        if os.path.exists(path):
+            shutil.copymode(path, temp_path)
+        else:
+            os.chmod(temp_path, 0o644)
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(header)
+            writer.writerows(rows)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _is_csv_header_cached(path: str, header: list[str]) -> bool:
+    """True when `path` is the same file we already validated and has only grown since."""
+    cached = _CSV_HEADER_CACHE.get(path)
+    if cached is None:
+        return False
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    dev, ino, size, cached_header = cached
+    return (stat.st_dev, stat.st_ino) == (dev, ino) and stat.st_size >= size and cached_header == tuple(header)
+
+
+def _remember_csv_header(path: str, header: list[str]) -> None:
+    stat = os.stat(path)
+    _CSV_HEADER_CACHE[path] = (stat.st_dev, stat.st_ino, stat.st_size, tuple(header))
+
+
 def ensure_csv_header(path: str, header: list[str]) -> None:
-    """Ensure a CSV file exists with the expected header order."""
-    if not os.path.isfile(path):
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "w", newline="", encoding="utf-8") as handle:
-            csv.writer(handle).writerow(header)
-        return
+    """Ensure a CSV file exists with the expected header order.
+
+    The result is cached per path, device and inode, so the header is only
+    re-checked when the file is replaced or truncated. Header migrations go
+    through a temp file and an atomic rename.
+    """
+    with _CSV_HEADER_LOCK:
+        if _is_csv_header_cached(path, header):
+            return
 
-    try:
-        with open(path, "r", newline="", encoding="utf-8") as handle:
-            rows = list(csv.reader(handle))
-    except Exception:
-        with open(path, "w", newline="", encoding="utf-8") as handle:
-            csv.writer(handle).writerow(header)
-        return
+        if not os.path.isfile(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write_csv_atomic(path, header, [])
+            _remember_csv_header(path, header)
+            return
 
-    if not rows:
-        with open(path, "w", newline="", encoding="utf-8") as handle:
-            csv.writer(handle).writerow(header)
-        return
+        try:
+            with open(path, "r", newline="", encoding="utf-8") as handle:
+                first_row = next(csv.reader(handle), None)
+        except Exception:
+            _write_csv_atomic(path, header, [])
+            _remember_csv_header(path, header)
+            return
 
-    if rows[0] != header:
-        with open(path, "w", newline="", encoding="utf-8") as handle:
-            writer = csv.writer(handle)
-            writer.writerow(header)
-            writer.writerows(rows[1:])
+        if first_row is None:
+            _write_csv_atomic(path, header, [])
+        elif first_row != header:
+            with open(path, "r", newline="", encoding="utf-8") as handle:
+                rows = list(csv.reader(handle))
+            _write_csv_atomic(path, header, rows[1:])
+        _remember_csv_header(path, header)
 
 
 def append_csv_row(path: str, row: list[object], header: list[str] | None = None) -> None:
@@ -40,12 +40,12 @@ import sys
 from datetime import datetime
 from threading import RLock, Thread
 
+from candle_store import get_last_candles
 from strategy_common import (
     append_csv_row,
     build_shortcycle_send_discord_message,
     ensure_csv_header,
     now_str,
-    read_last_n_rows,
     to_float,
 )
 from zoneinfo import ZoneInfo
@@ -57,7 +57,6 @@ if BASE_DIR not in sys.path:
 
 TV_DOC_DIR = os.path.join(BASE_DIR, "tv_doc")
 
-CSV_FILE_1MIN = os.path.join(TV_DOC_DIR, "webhook_data_1min.csv")
 H_TRADE_CSV_PATH = os.path.join(TV_DOC_DIR, "h_trade.csv")
 H_FOLLOW_TRADE_LOG_PATH = os.path.join(TV_DOC_DIR, "h_follow_trade.csv")
 H_FOLLOW_STATE_PATH = os.path.join(TV_DOC_DIR, "h_follow_state.json")
@@ -353,7 +352,7 @@ def _is_within_near_touch(close_price: float, level_price: float, points: float)
 def apply_h_follow_strategy() -> bool:
     """Apply the H follow strategy."""
     with STRATEGY_LOCK:
-        price_rows = read_last_n_rows(CSV_FILE_1MIN, 2)
+        price_rows = get_last_candles("1", 2)
         if len(price_rows) < 2:
             return False
 
@@ -28,6 +28,7 @@ import sys
 from datetime import datetime
 from threading import RLock, Thread
 
+from candle_store import get_last_candles
 from strategy_common import (
     append_csv_row,
     build_shortcycle_send_discord_message,
@@ -44,7 +45,6 @@ if BASE_DIR not in sys.path:
     sys.path.insert(0, BASE_DIR)
 
 TV_DOC_DIR = os.path.join(BASE_DIR, "tv_doc")
-CSV_FILE_15MIN = os.path.join(TV_DOC_DIR, "webhook_data_15min.csv")
 MXF_VALUE_CSV_PATH = os.path.join(TV_DOC_DIR, "mxf_value.csv")
 TT_MXF_DRAFT_TRADE_LOG_PATH = os.path.join(TV_DOC_DIR, "tt_mxf_draft_trade.csv")
 TT_MXF_DRAFT_STATE_PATH = os.path.join(TV_DOC_DIR, "tt_mxf_draft_state.json")
@@ -264,7 +264,7 @@ def _trigger_exit(side: str, close_price: float, reason: str, mxf_row: dict, bbr
 def apply_tt_mxf_draft_strategy() -> bool:
     """Apply the candidate 15-minute TT/MXF draft strategy."""
     with STRATEGY_LOCK:
-        price_rows = read_last_n_rows(CSV_FILE_15MIN, 2)
+        price_rows = get_last_candles(TT_MXF_DRAFT_TIMEFRAME, 2)
         mxf_rows = read_last_n_rows(MXF_VALUE_CSV_PATH, 2)
         if len(price_rows) < 2 or len(mxf_rows) < 2:
             return False
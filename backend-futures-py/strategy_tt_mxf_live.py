@@ -26,6 +26,7 @@ import sys
 from datetime import datetime
 from threading import RLock, Thread
 
+from candle_store import get_last_candles
 from strategy_common import (
     append_csv_row,
     build_shortcycle_send_discord_message,
@@ -42,7 +43,6 @@ if BASE_DIR not in sys.path:
     sys.path.insert(0, BASE_DIR)
 
 TV_DOC_DIR = os.path.join(BASE_DIR, "tv_doc")
-CSV_FILE_1MIN = os.path.join(TV_DOC_DIR, "webhook_data_1min.csv")
 MXF_VALUE_CSV_PATH = os.path.join(TV_DOC_DIR, "mxf_value.csv")
 TT_MXF_TRADE_LOG_PATH = os.path.join(TV_DOC_DIR, "tt_mxf_live_trade.csv")
 TT_MXF_STATE_PATH = os.path.join(TV_DOC_DIR, "tt_mxf_live_state.json")
@@ -247,7 +247,7 @@ def _trigger_exit(side: str, close_price: float, reason: str, mxf_row: dict, bbr
 def apply_tt_mxf_live_strategy() -> bool:
     """Apply the live conservative TT/MXF strategy on 1-minute data."""
     with STRATEGY_LOCK:
-        price_rows = read_last_n_rows(CSV_FILE_1MIN, 2)
+        price_rows = get_last_candles("1", 2)
         mxf_rows = read_last_n_rows(MXF_VALUE_CSV_PATH, 2)
         if len(price_rows) < 2 or len(mxf_rows) < 2:
             return False
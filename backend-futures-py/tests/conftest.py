@@ -0,0 +1,25 @@
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def mongo_db():
+    """A throwaway database on MONGO_TEST_URI (e.g. a local mongod); skipped when unset."""
+    uri = os.getenv("MONGO_TEST_URI")
+    if not uri:
+        pytest.skip("MONGO_TEST_URI 未設定，略過需要 mongod 的測試")
+    from pymongo import MongoClient
+
+    client = MongoClient(uri, serverSelectionTimeoutMS=3000)
+    name = f"test_{uuid.uuid4().hex[:12]}"
+    try:
+        yield client[name]
+    finally:
+        client.drop_database(name)
+        client.close()
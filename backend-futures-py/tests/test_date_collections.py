@@ -0,0 +1,52 @@
+from date_collections import (
+    _plan_stages,
+    ensure_time_index,
+    find_latest_doc,
+    is_index_only,
+    latest_lookup_stages,
+)
+
+
+def test_plan_stages_walks_nested_inputs():
+    plan = {
+        "stage": "LIMIT",
+        "inputStage": {"stage": "PROJECTION_COVERED", "inputStage": {"stage": "IXSCAN"}},
+    }
+    assert _plan_stages(plan) == ["LIMIT", "PROJECTION_COVERED", "IXSCAN"]
+    assert is_index_only(_plan_stages(plan))
+    assert not is_index_only(["LIMIT", "FETCH", "IXSCAN"])
+    assert not is_index_only(["SORT", "COLLSCAN"])
+
+
+def _insert_day(collection):
+    collection.insert_many([
+        {"time": f"2026-10-16 09:{minute:02d}:00", "tx_bvav": minute, "payload": "x" * 64}
+        for minute in range(30)
+    ])
+    # 同一秒的兩筆：以 _id 較大者為最新
+    collection.insert_one({"time": "2026-10-16 09:29:00", "tx_bvav": 99})
+
+
+def test_latest_lookup_is_index_only(mongo_db):
+    collection = mongo_db["2026-10-16"]
+    _insert_day(collection)
+    ensure_time_index(collection)
+
+    stages = latest_lookup_stages(collection)
+    assert "IXSCAN" in stages, stages
+    assert is_index_only(stages), stages
+
+    range_stages = latest_lookup_stages(collection, {"time": {"$lte": "2026-10-16 09:10:00"}})
+    assert is_index_only(range_stages), range_stages
+
+
+def test_find_latest_doc_returns_newest_with_projection(mongo_db):
+    collection = mongo_db["2026-10-16"]
+    _insert_day(collection)
+    ensure_time_index(collection)
+
+    doc = find_latest_doc(collection, projection={"_id": 0, "time": 1, "tx_bvav": 1})
+    assert doc == {"time": "2026-10-16 09:29:00", "tx_bvav": 99}
+
+    earlier = find_latest_doc(collection, {"time": {"$lte": "2026-10-16 09:10:00"}}, {"_id": 0, "tx_bvav": 1})
+    assert earlier == {"tx_bvav": 10}
@@ -0,0 +1,22 @@
+from etf_history import _holding_count, _rows_by_code
+
+
+def test_rows_by_code_keeps_the_last_duplicate():
+    doc = {
+        "data": [
+            {"code": "2330", "holding_count": "1,000"},
+            {"code": "2317", "holding_count": "500"},
+            {"code": "2330 ", "holding_count": "2,000"},
+            {"code": "", "holding_count": "9"},
+        ]
+    }
+    rows = _rows_by_code(doc)
+    assert list(rows) == ["2330", "2317"]
+    assert rows["2330"]["holding_count"] == "2,000"
+    assert _rows_by_code(None) == {}
+
+
+def test_holding_count_reads_the_numeric_field_only():
+    assert _holding_count({"holding_count": "1,000", "holding_count_num": 1000}) == 1000
+    assert _holding_count({"holding_count": "1,000", "holding_count_num": None}) == 0
+    assert _holding_count({"holding_count": "1,000"}) == 0
@@ -0,0 +1,34 @@
+import types
+
+from market_series import MXF_SOURCE, find_series, insert_series, parse_time
+
+
+def test_insert_series_reports_unparsed_times(mongo_db, capsys):
+    docs = [
+        {"time": "2026-10-16 09:01:00", "tx_bvav": 2},
+        {"time": "2026/10/16 09:02", "tx_bvav": 3},
+        {"time": "2026-10-16 09:00:00", "tx_bvav": 1},
+        {"time": "2026-10-16 09:01:00", "tx_bvav": 4},
+    ]
+    assert insert_series(mongo_db, MXF_SOURCE, docs) == 3
+    assert "1 筆 time 無法解析" in capsys.readouterr().out
+
+
+def test_find_series_streams_in_time_then_insert_order(mongo_db):
+    insert_series(mongo_db, MXF_SOURCE, [
+        {"time": "2026-10-16 09:01:00", "tx_bvav": 2},
+        {"time": "2026-10-16 09:00:00", "tx_bvav": 1},
+        {"time": "2026-10-16 09:01:00", "tx_bvav": 3},
+        {"time": "2026-10-17 09:00:00", "tx_bvav": 9},
+    ])
+
+    rows = find_series(mongo_db, MXF_SOURCE, parse_time("2026-10-16"), parse_time("2026-10-17"))
+    assert isinstance(rows, types.GeneratorType)
+    assert [(row["time"], row["tx_bvav"]) for row in rows] == [
+        ("2026-10-16 09:00:00", 1),
+        ("2026-10-16 09:01:00", 2),
+        ("2026-10-16 09:01:00", 3),
+    ]
+
+    after = find_series(mongo_db, MXF_SOURCE, after=parse_time("2026-10-16 09:00:00"))
+    assert [row["tx_bvav"] for row in after] == [2, 3, 9]
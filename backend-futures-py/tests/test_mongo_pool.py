@@ -0,0 +1,42 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from mongo_pool import _pool_options, close_mongo_clients, get_mongo_client, get_mongo_pool_stats
+
+
+def test_same_uri_shares_one_client():
+    uri = "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=100"
+    try:
+        assert get_mongo_client(uri) is get_mongo_client(uri)
+        assert "handshakes_saved" not in get_mongo_pool_stats()
+    finally:
+        close_mongo_clients()
+
+
+def test_pool_reuses_connections_against_mongod(mongo_db, monkeypatch):
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "4")
+    uri = os.environ["MONGO_TEST_URI"]
+    close_mongo_clients()
+    mongo_db["items"].insert_many([{"n": n} for n in range(10)])
+    before = get_mongo_pool_stats()
+
+    def read(n: int) -> int:
+        return get_mongo_client(uri)[mongo_db.name]["items"].count_documents({"n": {"$lte": n % 10}})
+
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            assert sum(executor.map(read, range(200))) == sum(n % 10 + 1 for n in range(200))
+        after = get_mongo_pool_stats()
+    finally:
+        close_mongo_clients()
+
+    assert after["client_requests"] - before["client_requests"] == 200
+    assert after["clients_created"] - before["clients_created"] == 1
+    assert after["checkouts"] - before["checkouts"] >= 200
+    # 200 次呼叫只透過 maxPoolSize 條連線完成，沒有每次都握手
+    assert 1 <= after["connections_created"] - before["connections_created"] <= 4
+
+
+def test_pool_options_read_env(monkeypatch):
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "7")
+    assert _pool_options()["maxPoolSize"] == 7
@@ -0,0 +1,84 @@
+import socket
+import time
+from threading import Event, Thread
+
+from snapshot_stream import SnapshotHub
+
+
+def _small_pair() -> tuple[socket.socket, socket.socket]:
+    server, client = socket.socketpair()
+    for sock in (server, client):
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    return server, client
+
+
+def _reader(sock: socket.socket, events: list[float], stop: Event) -> None:
+    sock.settimeout(0.1)
+    buffer = b""
+    while not stop.is_set():
+        try:
+            chunk = sock.recv(65536)
+        except socket.timeout:
+            continue
+        except OSError:
+            return
+        if not chunk:
+            return
+        buffer += chunk
+        while b"\n\n" in buffer:
+            event, buffer = buffer.split(b"\n\n", 1)
+            if event.startswith(b"event: quote"):
+                events.append(time.monotonic())
+
+
+def _wait_for(predicate, timeout: float = 10) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_stalled_subscriber_is_dropped_while_others_keep_receiving(monkeypatch):
+    monkeypatch.setenv("SSE_STALL_SECONDS", "0.5")
+    monkeypatch.setenv("SSE_FLUSH_SECONDS", "0.02")
+    monkeypatch.setenv("SSE_HEARTBEAT_SECONDS", "60")
+    counter = iter(range(1_000_000))
+    # 每次都變動、夠大的快照，讓不讀取的 client 很快塞滿 socket buffer
+    hub = SnapshotHub({"quote": lambda: {"n": next(counter), "pad": "x" * 32768}}, poll_seconds=0.05)
+
+    readers, stop = [], Event()
+    clients = []
+    try:
+        for index in range(4):
+            server, client = _small_pair()
+            clients.append(client)
+            assert hub.subscribe(server, {"quote"})
+            if index == 0:
+                continue  # 第一個 client 完全不讀取
+            events: list[float] = []
+            thread = Thread(target=_reader, args=(client, events, stop), daemon=True)
+            thread.start()
+            readers.append(events)
+
+        assert _wait_for(lambda: hub.stats()["dropped"] == 1), hub.stats()
+        dropped_at = time.monotonic()
+        stats = hub.stats()
+        assert stats["subscribers"] == 3
+        assert stats["events_queued"] >= stats["events_coalesced"] > 0
+
+        # 被斷線的 client 讀完殘留資料後會收到 EOF
+        clients[0].settimeout(2)
+        while clients[0].recv(65536):
+            pass
+
+        assert _wait_for(lambda: all(sum(t > dropped_at for t in events) >= 3 for events in readers)), [
+            len(events) for events in readers
+        ]
+    finally:
+        stop.set()
+        for client in clients:
+            client.close()
+    assert _wait_for(lambda: hub.stats()["subscribers"] == 0)
@@ -0,0 +1,130 @@
+"""Compact code -> market index for static/twStock.json.
+
+The monitors only need the `market` of a few hundred codes, but the JSON is
+~900 KB of names and topics. The index is a sorted array of fixed-width
+records (code padded to KEY_WIDTH bytes + one market byte) generated from the
+JSON next to it, memory-mapped on first lookup and binary-searched in place.
+It is rebuilt automatically when the JSON's size or mtime changes.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from threading import Lock
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+TW_STOCK_JSON_PATH = STATIC_DIR / "twStock.json"
+TW_STOCK_INDEX_PATH = STATIC_DIR / "twStock.market.idx"
+
+MARKETS = ("", "twse", "tpex", "us")
+KEY_WIDTH = 8
+RECORD_WIDTH = KEY_WIDTH + 1
+_MAGIC = b"TWSX1\0\0\0"
+# magic, source size, source mtime_ns, record count
+_HEADER = struct.Struct("<8sQQI")
+
+
+def build_market_index(json_path: Path = TW_STOCK_JSON_PATH) -> bytes:
+    """Serialize the index for `json_path` (header + sorted records)."""
+    stat = json_path.stat()
+    with open(json_path, "r", encoding="utf-8") as handle:
+        stocks = json.load(handle)
+
+    records = []
+    for code, info in stocks.items():
+        key = str(code).encode("ascii", "ignore")
+        if not key or len(key) > KEY_WIDTH:
+            continue
+        market = str((info or {}).get("market", "") or "")
+        market_id = MARKETS.index(market) if market in MARKETS else 0
+        records.append(key.ljust(KEY_WIDTH, b"\0") + bytes([market_id]))
+    records.sort()
+
+    header = _HEADER.pack(_MAGIC, stat.st_size, stat.st_mtime_ns, len(records))
+    return header + b"".join(records)
+
+
+def _is_current(data, json_path: Path) -> bool:
+    if len(data) < _HEADER.size:
+        return False
+    magic, size, mtime_ns, count = _HEADER.unpack_from(data, 0)
+    stat = json_path.stat()
+    return (
+        magic == _MAGIC
+        and size == stat.st_size
+        and mtime_ns == stat.st_mtime_ns
+        and len(data) == _HEADER.size + count * RECORD_WIDTH
+    )
+
+
+class MarketIndex:
+    """Lazily opened view over the index file."""
+
+    def __init__(self, json_path: Path = TW_STOCK_JSON_PATH, index_path: Path = TW_STOCK_INDEX_PATH) -> None:
+        self.json_path = json_path
+        self.index_path = index_path
+        self._data = None
+        self._count = 0
+        self._lock = Lock()
+
+    def _open(self):
+        with self._lock:
+            if self._data is not None:
+                return self._data
+            data = self._map_existing()
+            if data is None:
+                built = build_market_index(self.json_path)
+                try:
+                    tmp_path = self.index_path.with_suffix(".tmp")
+                    tmp_path.write_bytes(built)
+                    os.replace(tmp_path, self.index_path)
+                    data = self._map_existing()
+                except OSError as exc:
+                    print(f"⚠️ 無法寫入 {self.index_path.name}，改用記憶體索引: {exc}")
+                if data is None:
+                    data = built
+            self._count = _HEADER.unpack_from(data, 0)[3]
+            self._data = data
+            return data
+
+    def _map_existing(self):
+        try:
+            with open(self.index_path, "rb") as handle:
+                data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if _is_current(data, self.json_path):
+            return data
+        data.close()
+        return None
+
+    def get_market(self, code: str) -> str | None:
+        """Market of `code` ("twse", "tpex", "us" or ""), or None when the code is unknown."""
+        key = str(code or "").encode("ascii", "ignore")
+        if not key or len(key) > KEY_WIDTH:
+            return None
+        key = key.ljust(KEY_WIDTH, b"\0")
+        data = self._open()
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            offset = _HEADER.size + middle * RECORD_WIDTH
+            current = data[offset:offset + KEY_WIDTH]
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                return MARKETS[data[offset + KEY_WIDTH]]
+        return None
+
+
+_INDEX = MarketIndex()
+
+
+def get_stock_market(code: str) -> str | None:
+    return _INDEX.get_market(code)
@@ -1,12 +1,11 @@
 """Webhook ingestion server.
 
-This module only receives webhook payloads, persists candle rows, and dispatches
-to strategy modules. Strategy logic lives in separate files.
+This module only receives webhook payloads, records candles in `candle_store`,
+and dispatches to strategy modules. Strategy logic lives in separate files.
 """
 
 from __future__ import annotations
 
-import csv
 import http.server
 import json
 import os
@@ -19,51 +18,12 @@ BASE_DIR = os.path.dirname(__file__)
 if BASE_DIR not in sys.path:
     sys.path.insert(0, BASE_DIR)
 
-from strategy_common import TZ, ensure_csv_header
+from candle_store import CSV_FILE_BY_TIMEFRAME, append_candle, flush_candle_journal, load_candle_stores
+from strategy_common import TZ
 from strategy_h_follow import apply_h_follow_strategy
 from strategy_tt_mxf_draft import apply_tt_mxf_draft_strategy
 from strategy_tt_mxf_live import apply_tt_mxf_live_strategy
 
-TV_DOC_DIR = os.path.join(BASE_DIR, "tv_doc")
-
-CSV_FILE_1MIN = os.path.join(TV_DOC_DIR, "webhook_data_1min.csv")
-CSV_FILE_5MIN = os.path.join(TV_DOC_DIR, "webhook_data_5min.csv")
-CSV_FILE_10MIN = os.path.join(TV_DOC_DIR, "webhook_data_10min.csv")
-CSV_FILE_15MIN = os.path.join(TV_DOC_DIR, "webhook_data_15min.csv")
-
-CSV_FILE_BY_TIMEFRAME = {
-    "1": CSV_FILE_1MIN,
-    "5": CSV_FILE_5MIN,
-    "10": CSV_FILE_10MIN,
-    "15": CSV_FILE_15MIN,
-}
-
-CSV_HEADER = [
-    "Record Time",
-    "Symbol",
-    "Timeframe",
-    "TradingView Time",
-    "Open",
-    "High",
-    "Low",
-    "Close",
-    "MA_960",
-    "MA_P80",
-    "MA_P200",
-    "MA_N110",
-    "MA_N200",
-    "tt_short",
-    "tt_long",
-    "BBR",
-]
-
-
-def _append_webhook_row(path: str, row: list[object]) -> None:
-    """Append a received webhook candle to the target CSV."""
-    ensure_csv_header(path, CSV_HEADER)
-    with open(path, "a", newline="", encoding="utf-8") as handle:
-        csv.writer(handle).writerow(row)
-
 
 class WebhookHandler(http.server.BaseHTTPRequestHandler):
     def do_POST(self):
@@ -107,8 +67,7 @@ class WebhookHandler(http.server.BaseHTTPRequestHandler):
             except Exception:
                 tv_time = str(tv_time_ms)
 
-            target_csv = CSV_FILE_BY_TIMEFRAME.get(timeframe)
-            if target_csv is None:
+            if timeframe not in CSV_FILE_BY_TIMEFRAME:
                 self.send_error(400, f"Unsupported timeframe: {timeframe}")
                 return
 
@@ -130,7 +89,7 @@ class WebhookHandler(http.server.BaseHTTPRequestHandler):
                 tt_long,
                 bbr,
             ]
-            _append_webhook_row(target_csv, webhook_row)
+            append_candle(timeframe, webhook_row)
 
             if timeframe == "1":
                 apply_tt_mxf_live_strategy()
@@ -172,6 +131,7 @@ def run_server():
         daemon_threads = True
 
     try:
+        load_candle_stores()
         httpd = ThreadingHTTPServer(("", PORT), WebhookHandler)
         sys.stdout.flush()
         httpd.serve_forever()
@@ -182,6 +142,7 @@ def run_server():
     finally:
         if "httpd" in locals():
             httpd.server_close()
+        flush_candle_journal()
         print("Server stopped.")
         sys.stdout.flush()
 